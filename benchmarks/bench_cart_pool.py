@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares pricing orders in fresh carts against pooled carts
+
+Syntax: `PYTHONPATH=.:sales_taxes python3 -m benchmarks.bench_cart_pool
+[orders] [lines]`
+"""
+from __future__ import print_function
+from benchmarks.orders import generate_order_lines
+from sales_taxes.cart import (Cart, CartPool)
+from sales_taxes.main import read_order
+from sales_taxes.tax_profile import TaxProfileFactory
+import gc
+import sys
+import timeit
+import tracemalloc
+
+
+def fresh_carts(profile, orders):
+    for items in orders:
+        cart = Cart.from_profile(profile)
+        cart.add_items(items)
+        cart.get_net_total()
+
+
+def pooled_carts(profile, orders):
+    pool = CartPool(profile)
+    for items in orders:
+        cart = pool.acquire()
+        cart.add_items(items)
+        cart.get_net_total()
+        pool.release(cart)
+
+
+def measure_peak(fn):
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main(count=10000, lines=5, repeat=5):
+    profile = TaxProfileFactory.get_profile('StandardTaxProfile')
+    items = list(read_order(generate_order_lines(count * lines)))
+    orders = [items[i:i + lines] for i in range(0, len(items), lines)]
+    baseline = None
+    for name, fn in (('fresh', fresh_carts), ('pooled', pooled_carts)):
+        best = min(timeit.repeat(lambda: fn(profile, orders),
+                                 number=1, repeat=repeat))
+        peak = measure_peak(lambda: fn(profile, orders))
+        baseline = baseline or best
+        print("{:<8} {:>8.1f} us/order {:>6.2f}x {:>8.1f} KiB peak".format(
+            name, best / count * 1e6, baseline / best, peak / 1024.0))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
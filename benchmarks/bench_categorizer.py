@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares keyword categorization against substring checks
+
+Syntax: `PYTHONPATH=.:sales_taxes python3 -m benchmarks.bench_categorizer`
+"""
+from __future__ import print_function
+from benchmarks.orders import generate_order_lines
+from sales_taxes.categorizer import KeywordCategorizer
+from sales_taxes.product import ProductCategory
+import random
+import time
+
+
+def substring_categorize(keywords, name):
+    for category, keyword in keywords:
+        if keyword in name:
+            return category
+    return ProductCategory.OTHER
+
+
+def main(count=20000):
+    rnd = random.Random(42)
+    categories = (ProductCategory.BOOKS, ProductCategory.FOODS,
+                  ProductCategory.MEDICAL)
+    names = [line.split(' at ')[0] for line in generate_order_lines(count)]
+    for size in (3, 100, 1000, 5000):
+        keywords = [(rnd.choice(categories), "sku{:05d}".format(i))
+                    for i in range(size)]
+        categorizer = KeywordCategorizer(keywords)
+
+        start = time.time()
+        [substring_categorize(keywords, name) for name in names]
+        substring = time.time() - start
+        start = time.time()
+        [categorizer.categorize(name) for name in names]
+        automaton = time.time() - start
+        print("{:>5} keywords: substring {:>7.3f}s automaton {:>7.3f}s".format(
+            size, substring, automaton))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Measures the memory held by a cart per item
+
+Syntax: `PYTHONPATH=.:sales_taxes python3 -m benchmarks.bench_memory [items]`
+"""
+from __future__ import print_function
+from decimal import Decimal
+from sales_taxes.main import create_cart
+from sales_taxes.product import (Product, ProductSource, ProductCategory)
+import gc
+import sys
+import tracemalloc
+
+
+def generate_products(count):
+    for i in range(count):
+        yield Product("product {}".format(i), Decimal(i % 10000).scaleb(-2),
+                      ProductSource.IMPORTED if i % 3 else ProductSource.LOCAL,
+                      ProductCategory.OTHER), 1
+
+
+def measure(fn):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main(count=100000):
+    products, products_size = measure(lambda: list(generate_products(count)))
+    cart = create_cart()
+    _, cart_size = measure(lambda: cart.add_items(products))
+    print("Product  {:>8.1f} bytes/item".format(products_size / count))
+    print("CartItem {:>8.1f} bytes/item".format(cart_size / count))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Measures order parsing throughput over a synthetic order file
+
+Syntax: `PYTHONPATH=.:sales_taxes python3 -m benchmarks.bench_parser [lines]`
+"""
+from __future__ import print_function
+from benchmarks.orders import generate_order_lines
+from sales_taxes.main import get_input_handle
+from sales_taxes.parser import (parse_order, parse_orders, ProductCache)
+from sales_taxes.product import Product
+import os
+import sys
+import tempfile
+import time
+
+
+def timed(fn, filename, mapped=False):
+    with get_input_handle(filename, mapped) as handle:
+        start = time.time()
+        fn(handle)
+        return time.time() - start
+
+
+def main(count=1000000):
+    fd, filename = tempfile.mkstemp(suffix='.txt')
+    try:
+        with os.fdopen(fd, 'w') as handle:
+            handle.writelines(generate_order_lines(count))
+
+        benchmarks = (
+            ('parse_order', lambda lines: [parse_order(l) for l in lines]),
+            ('parse_orders', lambda lines: list(parse_orders(lines))),
+            ('Product', lambda lines: [(q, Product(**d)) for q, d in
+                                       parse_orders(lines)]),
+            ('ProductCache', lambda lines:
+                list(ProductCache(50000).parse_orders(lines))),
+        )
+        mapped = (
+            ('mmap', lambda reader: list(reader.parse_orders())),
+            ('mmap+cache', lambda reader:
+                list(reader.parse_products(ProductCache(50000)))),
+        )
+        runs = [(name, fn, False) for name, fn in benchmarks] + \
+            [(name, fn, True) for name, fn in mapped]
+        for name, fn, is_mapped in runs:
+            elapsed = timed(fn, filename, is_mapped)
+            print("{:<14} {:>8.2f}s {:>12.0f} lines/s".format(
+                name, elapsed, count / elapsed))
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares the cost of reading the cart items to print a receipt
+
+Syntax: `PYTHONPATH=.:sales_taxes python3 -m benchmarks.bench_receipt [items]`
+"""
+from __future__ import print_function
+from copy import deepcopy
+from benchmarks.bench_memory import generate_products
+from sales_taxes.main import create_cart
+import sys
+import time
+import tracemalloc
+
+SOURCES = (
+    ('deepcopy', lambda cart: deepcopy(cart.get_items())),
+    ('get_items', lambda cart: cart.get_items()),
+    ('get_items_view', lambda cart: cart.get_items_view()),
+)
+
+
+class NullOutput(object):
+    def write(self, text):
+        pass
+
+
+def render(items, output):
+    for ci in items:
+        output.write("{}\n".format(ci))
+
+
+def main(*sizes):
+    output = NullOutput()
+    for size in sizes or (10000, 100000, 1000000):
+        cart = create_cart()
+        cart.add_items(generate_products(size))
+        for name, source in SOURCES:
+            tracemalloc.start()
+            start = time.time()
+            render(source(cart), output)
+            elapsed = time.time() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print("{:>8} lines {:<15} {:>8.3f}s {:>10.1f} KiB peak".format(
+                size, name, elapsed, peak / 1024.0))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares per line receipt writes against the chunked receipt writer
+
+Syntax:
+`PYTHONPATH=.:sales_taxes python3 -m benchmarks.bench_receipt_writer [items]`
+"""
+from __future__ import print_function
+from benchmarks.bench_memory import generate_products
+from sales_taxes.main import create_cart
+from sales_taxes.receipt_writer import ReceiptWriter
+import os
+import sys
+import time
+
+
+def write_per_line(cart, output):
+    for ci in cart.get_items_view():
+        output.write("{}\n".format(ci))
+    output.write("Sales Taxes: {}\n".format(cart.get_taxes()))
+    output.write("Total: {}\n".format(cart.get_net_total()))
+
+
+def main(count=200000):
+    cart = create_cart()
+    cart.add_items(generate_products(count))
+    writers = [('per line', write_per_line)] + [
+        ('{} x{}'.format(fmt, size),
+         lambda c, o, f=fmt, s=size: ReceiptWriter(o, f, s).write_cart(c))
+        for fmt in ReceiptWriter.FORMATS for size in (1, 1000)]
+    with open(os.devnull, 'w') as output:
+        for name, write in writers:
+            start = time.time()
+            write(cart, output)
+            print("{:<12} {:>8.3f}s".format(name, time.time() - start))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares the speed of the tax rounding policies
+
+Syntax: `PYTHONPATH=.:sales_taxes python3 -m benchmarks.bench_rounding_policy`
+"""
+from __future__ import print_function
+from decimal import Decimal
+from sales_taxes.rounding_policy import RoundingPolicyFactory
+import random
+import timeit
+
+POLICIES = ('StandardRoundingPolicy', 'CeilingRoundingPolicy')
+
+
+def sample_taxes(count, seed=42):
+    """Generates unrounded tax amounts as the cart produces them.
+
+    Prices, rates and quantities are drawn from wide ranges, so amounts
+    rarely repeat.
+    """
+    rnd = random.Random(seed)
+    rates = (Decimal('0.10'), Decimal('0.05'), Decimal('0.15'))
+    return [Decimal(rnd.randint(1, 10 ** 7)).scaleb(-2) * rnd.choice(rates) *
+            rnd.randint(1, 50) for _ in range(count)]
+
+
+def main(count=200000, repeat=5):
+    values = sample_taxes(count)
+    baseline = None
+    for name in POLICIES:
+        # A new policy per run, so no state is carried between runs
+        def run():
+            apply = RoundingPolicyFactory.create_policy(name).apply
+            return [apply(v) for v in values]
+        best = min(timeit.repeat(run, number=1, repeat=repeat))
+        baseline = baseline or best
+        print("{:<26} {:>8.1f} ns/call {:>6.2f}x".format(
+            name, best / count * 1e9, baseline / best))
+
+
+if __name__ == '__main__':
+    main()
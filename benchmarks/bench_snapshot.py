@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares the binary cart format against pickle
+
+Syntax: `PYTHONPATH=.:sales_taxes python3 -m benchmarks.bench_snapshot
+[items...]`
+"""
+from __future__ import print_function
+from benchmarks.orders import generate_order_lines
+from sales_taxes.cart import Cart
+from sales_taxes.main import (create_cart, read_order)
+import pickle
+import sys
+import timeit
+
+FORMATS = (
+    ('pickle', lambda cart: pickle.dumps(cart, pickle.HIGHEST_PROTOCOL),
+     pickle.loads),
+    ('dump', Cart.dump, Cart.load),
+)
+
+
+def main(*sizes):
+    for size in sizes or (10000, 100000):
+        cart = create_cart()
+        cart.add_items(read_order(generate_order_lines(size, variety=size)))
+        count = len(cart.get_items())
+        for name, dump, load in FORMATS:
+            data = dump(cart)
+            assert load(data).get_items() == cart.get_items()
+            dump_time = min(timeit.repeat(lambda: dump(cart), number=1,
+                                          repeat=3))
+            load_time = min(timeit.repeat(lambda: load(data), number=1,
+                                          repeat=3))
+            print("{:>8} items {:<7} {:>7.1f} bytes/item {:>8.1f} ms dump "
+                  "{:>8.1f} ms load".format(count, name, len(data) / count,
+                                            dump_time * 1e3,
+                                            load_time * 1e3))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
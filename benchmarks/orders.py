@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""Synthetic order generators"""
+import random
+
+PRODUCTS = (
+    'book', 'music CD', 'chocolate bar', 'box of chocolates',
+    'bottle of perfume', 'packet of headache pills', 'pair of shoes',
+    'box of books', 'bar of soap', 'bottle of wine',
+)
+
+
+def generate_order_lines(count, seed=42, variety=1000):
+    """Generates well formatted order strings.
+
+    :param count: number of order strings
+    :param seed: random seed, for reproducible orders
+    :param variety: number of distinct product prices
+    :type count: int
+    :type seed: int
+    :type variety: int
+    :return: order strings terminated by a new line
+    :rtype: Iterable
+    """
+    rnd = random.Random(seed)
+    prices = ["{}.{:02d}".format(rnd.randint(0, 200), rnd.randint(0, 99))
+              for _ in range(variety)]
+    for _ in range(count):
+        yield "{} {}{} at {}\n".format(rnd.randint(1, 5),
+                                       "imported " if rnd.random() < 0.3
+                                       else "",
+                                       rnd.choice(PRODUCTS),
+                                       rnd.choice(prices))
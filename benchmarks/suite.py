@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Times each stage of the pricing pipeline at several order sizes
+
+Results are printed as JSON, optionally saved, and compared against a saved
+baseline. The exit status is 1 when a stage is slower than the baseline by
+more than the threshold.
+
+Syntax: `PYTHONPATH=.:sales_taxes python3 -m benchmarks.suite
+[--sizes 100,1000,10000] [--repeat 5] [--min-time 0.2] [--save FILE]
+[--baseline FILE] [--threshold 0.2]`
+"""
+from __future__ import print_function
+from io import StringIO
+from benchmarks.orders import generate_order_lines
+from sales_taxes.cart import Cart
+from sales_taxes.main import (create_cart, parse_order, fuzzy_categorize,
+                              read_order, receipt_printer)
+import argparse
+import json
+import platform
+import sys
+import timeit
+
+SIZES = (100, 1000, 10000)
+
+
+def bench_parse_order(lines):
+    return lambda: [parse_order(line) for line in lines]
+
+
+def bench_fuzzy_categorize(lines):
+    names = [parse_order(line)[1]['name'] for line in lines]
+    return lambda: [fuzzy_categorize(name) for name in names]
+
+
+def bench_add_item(lines):
+    items = list(read_order(lines))
+
+    def run():
+        cart = create_cart()
+        for product, quantity in items:
+            cart.add_item(product, quantity)
+    return run
+
+
+def bench_calculate_taxes(lines):
+    cart = create_cart()
+    cart.add_items(read_order(lines))
+    items = cart.get_items()
+    table, rounding_policy = cart._get_pricer()
+    calculate = Cart._calculate_item_tax
+    return lambda: [calculate(ci, table, rounding_policy) for ci in items]
+
+
+def bench_receipt_printer(lines):
+    cart = create_cart()
+    cart.add_items(read_order(lines))
+    return lambda: receipt_printer(cart, StringIO())
+
+
+STAGES = (
+    ('parse_order', bench_parse_order),
+    ('fuzzy_categorize', bench_fuzzy_categorize),
+    ('add_item', bench_add_item),
+    ('calculate_taxes', bench_calculate_taxes),
+    ('receipt_printer', bench_receipt_printer),
+)
+
+
+def run_suite(sizes=SIZES, repeat=5, stages=STAGES, min_time=0.2):
+    """Times every stage at every order size.
+
+    Orders are generated with a fixed seed, so runs are comparable. Each run
+    loops over the stage for at least `min_time` seconds and the best time
+    per loop of `repeat` runs is kept.
+
+    :param sizes: numbers of order lines
+    :param repeat: number of timed runs per stage and size
+    :param stages: pairs of stage name and a function preparing the timed
+        callable from the order lines
+    :param min_time: shortest duration of a timed run in seconds
+    :type sizes: Iterable
+    :type repeat: int
+    :type stages: Iterable
+    :type min_time: float
+    :return: stage timings and the environment they were measured in
+    :rtype: dict
+    """
+    results = {}
+    for size in sizes:
+        lines = list(generate_order_lines(size))
+        for name, prepare in stages:
+            timer = timeit.Timer(prepare(lines))
+            number = 1
+            while timer.timeit(number) < min_time:
+                number *= 2
+            best = min(timer.repeat(repeat, number)) / number
+            results.setdefault(name, {})[str(size)] = dict(
+                seconds=best, ns_per_line=best / size * 1e9)
+    return dict(python=platform.python_version(),
+                implementation=platform.python_implementation(),
+                repeat=repeat, results=results)
+
+
+def compare(current, baseline, threshold=0.2):
+    """Compares suite results against a baseline.
+
+    Only stages and sizes present in both results are compared.
+
+    :param current: results of :func:`run_suite`
+    :param baseline: earlier results of :func:`run_suite`
+    :param threshold: tolerated slowdown, 0.2 allows 20% slower stages
+    :type current: dict
+    :type baseline: dict
+    :type threshold: float
+    :return: stage, size, and ratio of the current to the baseline time,
+        for every stage and size slower than the threshold
+    :rtype: list
+    """
+    regressions = []
+    for name, sizes in sorted(current['results'].items()):
+        for size, timing in sorted(sizes.items(), key=lambda i: int(i[0])):
+            try:
+                base = baseline['results'][name][size]['seconds']
+            except KeyError:
+                continue
+            ratio = timing['seconds'] / base if base else 1.0
+            if ratio > 1 + threshold:
+                regressions.append((name, size, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Times each stage of the pricing pipeline.')
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)),
+                        help='comma separated numbers of order lines')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='shortest duration of a timed run in seconds')
+    parser.add_argument('--save', help='file to save the results to')
+    parser.add_argument('--baseline', help='results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='tolerated slowdown against the baseline')
+    args = parser.parse_args(argv)
+
+    results = run_suite([int(size) for size in args.sizes.split(',')],
+                        args.repeat, min_time=args.min_time)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    print(json.dumps(results, indent=2, sort_keys=True))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for name, size, ratio in regressions:
+            print("REGRESSION {} at {} lines: {:.2f}x slower".format(
+                name, size, ratio), file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
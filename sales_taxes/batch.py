@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Batch entry point pricing many orders in parallel"""
+from __future__ import print_function
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+from itertools import islice
+from sales_taxes.main import (get_input_handle, price_order, create_cart,
+                              read_order, receipt_printer)
+import argparse
+import os
+import sys
+import time
+
+
+def main(argv=None):
+    """Batch entry point.
+
+    Syntax: `script.py [--workers N] [--chunksize N] [--delimiter D]
+    [--shards N] source`
+    Where `source` is a directory containing one order per file, a file
+    containing orders separated by delimiter lines, or `-` for standard
+    input.
+
+    Prices every order in a pool of worker processes, prints the receipts
+    in input order separated by a delimiter line and reports the throughput
+    on standard error. With `--shards` the orders are priced one at a time,
+    each split into shards priced in parallel, for very large orders.
+    Orders that cannot be priced are reported on standard error by their
+    number, counted from 1, and skipped; the exit status is then 1.
+
+        :param argv: command line arguments (defaults to `sys.argv`)
+        :type argv: list
+        :return: exit status
+        :rtype: int
+    """
+    parser = argparse.ArgumentParser(description='Prints sales receipts for '
+                                                 'a batch of orders.')
+    parser.add_argument('source',
+                        help='order directory, multi-order file or -')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes '
+                             '(defaults to the number of CPUs)')
+    parser.add_argument('--chunksize', type=int, default=1,
+                        help='orders sent to a worker at a time')
+    parser.add_argument('--delimiter', default='',
+                        help='line separating orders (defaults to a blank '
+                             'line)')
+    parser.add_argument('--shards', type=int, default=None,
+                        help='split each order into shards priced in '
+                             'parallel')
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    count = 0
+    failures = 0
+    orders = read_orders(args.source, args.delimiter)
+    if args.shards:
+        receipts = process_large_orders(orders, args.workers, args.shards)
+    else:
+        receipts = process_orders(orders, args.workers, args.chunksize)
+    for number, receipt in enumerate(receipts, 1):
+        if isinstance(receipt, FailedOrder):
+            print("Cannot price order {}: {}".format(number, receipt.error),
+                  file=sys.stderr)
+            failures += 1
+            continue
+        if count:
+            sys.stdout.write("{}\n".format(args.delimiter))
+        sys.stdout.write(receipt)
+        count += 1
+    elapsed = time.time() - start
+    print("Processed {} orders in {:.2f}s ({:.1f} orders/s)".format(
+        count, elapsed, count / elapsed if elapsed else 0), file=sys.stderr)
+    if failures:
+        print("{} orders failed".format(failures), file=sys.stderr)
+        return 1
+    return 0
+
+
+class FailedOrder(object):
+    """Takes the place of the receipt of an order that was not priced."""
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        """Initialize with the reason of the failure.
+
+        :param error: error message
+        :type error: str
+        :return:
+        """
+        self.error = error
+
+    def __reduce__(self):
+        return self.__class__, (self.error,)
+
+
+def read_orders(source, delimiter=''):
+    """Reads the orders of a batch.
+
+    :param source: order directory, multi-order file or `-`
+    :param delimiter: line separating orders in a multi-order file
+    :type source: str
+    :type delimiter: str
+    :return: lines of each order
+    :rtype: Iterable
+    """
+    if os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            with get_input_handle(os.path.join(source, filename)) as handle:
+                yield handle.readlines()
+    else:
+        with get_input_handle(None if source == '-' else source) as handle:
+            for order in split_orders(handle, delimiter):
+                yield order
+
+
+def split_orders(lines, delimiter=''):
+    """Splits a stream of order lines into orders.
+
+    :param lines: formatted strings describing the order items
+    :param delimiter: line separating orders
+    :type lines: Iterable
+    :type delimiter: str
+    :return: lines of each order
+    :rtype: Iterable
+    """
+    order = []
+    for line in lines:
+        if line.strip() == delimiter:
+            if order:
+                yield order
+            order = []
+        else:
+            order.append(line)
+    if order:
+        yield order
+
+
+def process_orders(orders, workers=None, chunksize=1, window=4):
+    """Prices orders in a pool of worker processes.
+
+    Each worker builds its own cart with the standard tax definitions.
+    Orders are read and sent to the workers as receipts are consumed, at
+    most `window` chunks per worker at a time, so large batches are never
+    held in memory as a whole.
+
+    :param orders: lines of each order
+    :param workers: number of worker processes (defaults to the number of
+        CPUs)
+    :param chunksize: orders sent to a worker at a time
+    :param window: chunks in flight per worker
+    :type orders: Iterable
+    :type workers: int
+    :type chunksize: int
+    :type window: int
+    :return: receipt of each order, or :type:`FailedOrder` if it could not
+        be priced, in input order
+    :rtype: Iterable
+    """
+    assert chunksize > 0
+    assert window > 0
+    workers = workers or os.cpu_count() or 1
+    orders = iter(orders)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            chunk = list(islice(orders, chunksize))
+            if not chunk:
+                break
+            if len(pending) >= workers * window:
+                for receipt in pending.popleft().result():
+                    yield receipt
+            pending.append(executor.submit(price_orders, chunk))
+        while pending:
+            for receipt in pending.popleft().result():
+                yield receipt
+
+
+def price_orders(orders):
+    """Prices a chunk of orders.
+
+    A failing order does not stop the others from being priced.
+
+    :param orders: lines of each order
+    :type orders: Iterable
+    :return: receipt of each order, or :type:`FailedOrder` if it could not
+        be priced
+    :rtype: list
+    """
+    receipts = []
+    for lines in orders:
+        try:
+            receipts.append(price_order(lines))
+        except Exception as e:
+            receipts.append(FailedOrder(str(e)))
+    return receipts
+
+
+def process_large_orders(orders, workers=None, shards=None):
+    """Prices orders one at a time, each in parallel shards.
+
+    :param orders: lines of each order
+    :param workers: number of worker processes
+    :param shards: number of shards per order (defaults to `workers`)
+    :type orders: Iterable
+    :type workers: int
+    :type shards: int
+    :return: receipt of each order, or :type:`FailedOrder` if it could not
+        be priced, in input order
+    :rtype: Iterable
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for order in orders:
+            try:
+                receipt = price_order_sharded(
+                    order, executor, shards or workers or os.cpu_count())
+            except Exception as e:
+                receipt = FailedOrder(str(e))
+            yield receipt
+
+
+def price_order_sharded(lines, executor, shards,
+                        tax_profile='StandardTaxProfile'):
+    """Prices an order split into shards priced in parallel.
+
+    Each shard is priced in its own cart, the carts are merged in order.
+    The receipt is the same as the one of :func:`price_order`.
+
+    :param lines: formatted strings describing the order items
+    :param executor: executor pricing the shards
+    :param shards: number of shards
+    :param tax_profile: name of the tax profile
+    :type lines: Sequence
+    :type executor: concurrent.futures.Executor
+    :type shards: int
+    :type tax_profile: str
+    :return: receipt of the order
+    :rtype: str
+    """
+    cart = create_cart(tax_profile)
+    for shard_cart in executor.map(price_shard, partition(lines, shards),
+                                   [tax_profile] * shards):
+        cart.merge(shard_cart)
+    output = StringIO()
+    receipt_printer(cart, output)
+    return output.getvalue()
+
+
+def price_shard(lines, tax_profile='StandardTaxProfile'):
+    """Prices a part of an order.
+
+    :param lines: formatted strings describing the order items
+    :param tax_profile: name of the tax profile
+    :type lines: Iterable
+    :type tax_profile: str
+    :return: a cart holding the priced items
+    :rtype: Cart
+    """
+    cart = create_cart(tax_profile)
+    cart.add_items(read_order(lines))
+    return cart
+
+
+def partition(lines, parts):
+    """Splits a sequence into consecutive parts of about the same size.
+
+    :param lines: sequence to split
+    :param parts: number of parts
+    :type lines: Sequence
+    :type parts: int
+    :return: the parts, some of which are empty if there are fewer lines
+        than parts
+    :rtype: list
+    """
+    assert parts > 0
+    bounds = [len(lines) * part // parts for part in range(parts + 1)]
+    return [lines[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,20 @@
 # -*- coding: utf-8 -*-
-from copy import deepcopy
+from array import array
+from collections.abc import Sequence
+from contextlib import contextmanager
+from .columnar import from_cents
 from .rounding_policy import (RoundingPolicyFactory, BaseRoundingPolicy)
-from .tax_definition import BaseTaxDefinition
-from .product import Product
+from .tax_definition import (TaxDefinitionFactory, BaseTaxDefinition,
+                             TaxRuleTable)
+from .product import (Product, ProductSource, ProductCategory)
 import decimal
+import struct
+import sys
+
+# Binary cart format, see `Cart.dump`
+DUMP_MAGIC = b'SCRT'
+DUMP_VERSION = 1
+_DUMP_HEADER = struct.Struct('<4sBIII')
 
 
 class Cart(object):
@@ -13,6 +24,12 @@ class Cart(object):
     information about the each item. :type:`Cart` is also responsible for
     calculating the taxes per item, and rounding currency values.
 
+    Cart items are immutable, the cart replaces an item whenever its
+    quantity or the tax rules change. Taxes are calculated lazily: changes
+    only mark the affected items, an item calculates its tax on first
+    access and the tax total only adds up the items taxed since the last
+    read.
+
     """
     class CartItem(object):
         """Represents an entry in shopping cart.
@@ -20,20 +37,88 @@ class Cart(object):
         Contains data about the product, the quantity, the tax, and calculation
         of totals per entry.
 
+        Entries created by a cart are given the tax rules, the tax is
+        calculated on first access unless known and kept afterwards.
+
         """
-        def __init__(self, product, quantity):
+        __slots__ = ('product', 'quantity', '_tax', '_pricer')
+
+        def __init__(self, product, quantity, tax=None, pricer=None):
             """Initialize with basic information about an item.
 
             :param product: the product added to the cart
             :param quantity: quantity of the product
+            :param tax: tax of the entry (defaults to zero without `pricer`)
+            :param pricer: tax rule table and rounding policy calculating
+                the tax on first access when `tax` is not given
             :type product: Product
             :type quantity: int
+            :type tax: decimal.Decimal
+            :type pricer: tuple
             :return:
             """
             assert isinstance(product, Product)
-            self.product = product
-            self.quantity = quantity
-            self.tax = decimal.Decimal(0)
+            _set = super(Cart.CartItem, self).__setattr__
+            _set('product', product)
+            _set('quantity', quantity)
+            if tax is None and pricer is None:
+                tax = decimal.Decimal(0)
+            _set('_tax', tax)
+            _set('_pricer', pricer)
+
+        @property
+        def tax(self):
+            """Tax of the entry, calculated on first access.
+
+            :return: rounded tax of this cart entry
+            :rtype: decimal.Decimal
+            """
+            tax = self._tax
+            if tax is None:
+                tax = Cart._calculate_item_tax(self, *self._pricer)
+                super(Cart.CartItem, self).__setattr__('_tax', tax)
+            return tax
+
+        def _replace(self, **changes):
+            """Creates a copy of the entry with some attributes changed.
+
+            The tax of a copy of an entry created by a cart is calculated
+            again, unless given.
+
+            :param changes: new values of `quantity` and/or `tax`
+            :return: the new entry
+            :rtype: Cart.CartItem
+            """
+            quantity = changes.get('quantity', self.quantity)
+            if 'tax' in changes or self._pricer is None:
+                return self.__class__(self.product, quantity,
+                                      changes.get('tax', self._tax),
+                                      self._pricer)
+            return self.__class__(self.product, quantity,
+                                  pricer=self._pricer)
+
+        def __setattr__(self, name, value):
+            raise AttributeError('CartItem is immutable.')
+
+        def __delattr__(self, name):
+            raise AttributeError('CartItem is immutable.')
+
+        def __reduce__(self):
+            return self.__class__, (self.product, self.quantity, self.tax)
+
+        def __eq__(self, other):
+            if isinstance(other, self.__class__):
+                return (self.product, self.quantity, self.tax) == \
+                    (other.product, other.quantity, other.tax)
+            else:
+                return False
+
+        def __ne__(self, other):
+            return not self.__eq__(other)
+
+        def __hash__(self):
+            # Without the tax, so that hashing does not calculate it
+            return hash((self.product, self.quantity))
 
         @property
         def sub_total(self):
@@ -62,34 +147,410 @@ class Cart(object):
             return "{} {}: {}".format(self.quantity,
                                       self.product, self.net_total)
 
-    def __init__(self, rounding_policy=RoundingPolicyFactory.
-                 create_policy('StandardRoundingPolicy')):
+    class ItemsView(Sequence):
+        """Read-only, live view of the cart items.
+
+        Gives access to the cart items without copying them. The view
+        reflects later changes made to the cart.
+
+        """
+        __slots__ = ('_items',)
+
+        def __init__(self, items):
+            self._items = items
+
+        def __getitem__(self, index):
+            return self._items[index]
+
+        def __len__(self):
+            return len(self._items)
+
+        def __iter__(self):
+            return iter(self._items)
+
+    def __init__(self, rounding_policy=None):
         """Initializing a cart object with a tax rounding policy.
 
-        :param rounding_policy: Tax rounding policy for this cart.
+        :param rounding_policy: Tax rounding policy for this cart (defaults
+            to a new :type:`StandardRoundingPolicy`)
         :type rounding_policy: BaseRoundingPolicy
         :return:
         """
+        if rounding_policy is None:
+            rounding_policy = RoundingPolicyFactory.create_policy(
+                'StandardRoundingPolicy')
         assert isinstance(rounding_policy, BaseRoundingPolicy)
         self._tax_definitions = []
+        self._tax_table = None
+        self._pricer = None
         self._cart_items = []
+        self._cart_index = {}
         self._rounding_policy = rounding_policy
+        self._sub_total = decimal.Decimal(0)
+        # Tax total of the items, except those at the untaxed positions
+        self._tax_total = decimal.Decimal(0)
+        self._untaxed = set()
+        self._journal = None
+        self._dirty_items = None
+        self._new_definitions = None
+
+    @classmethod
+    def from_profile(cls, tax_profile):
+        """Creates a cart applying the rules of a tax profile.
+
+        The cart shares the compiled tax rules of the profile, so no tax
+        definitions need to be added.
+
+        :param tax_profile: tax definitions and rounding policy to apply
+        :type tax_profile: TaxProfile
+        :return: an empty cart
+        :rtype: Cart
+        """
+        cart = cls(tax_profile.rounding_policy)
+        cart._tax_definitions = list(tax_profile.tax_definitions)
+        cart._tax_table = tax_profile.tax_table
+        return cart
 
-    def _calculate_taxes(self):
-        """Calculates taxes for each cart item
+    def reset(self):
+        """Empties the cart so that it can be reused for another order.
 
-        Iterates through all cart items and apply each configured tax rule and
-        rounding rule.
+        The tax definitions and the rounding policy are kept, and the
+        internal containers are cleared in place rather than reallocated.
+        Views returned by :meth:`get_items_view` become empty as well.
 
         :return:
         """
+        assert self._journal is None, 'Cannot reset within a transaction.'
+        del self._cart_items[:]
+        self._cart_index.clear()
+        self._sub_total = decimal.Decimal(0)
+        self._tax_total = decimal.Decimal(0)
+        self._untaxed.clear()
+
+    def _empty_copy(self):
+        """Creates an empty cart sharing the tax rules of this cart.
+
+        :return: an empty cart
+        :rtype: Cart
+        """
+        cart = self.__class__(self._rounding_policy)
+        cart._tax_definitions = list(self._tax_definitions)
+        cart._tax_table = self._tax_table
+        cart._pricer = self._pricer
+        return cart
+
+    def __getstate__(self):
+        # Products are flattened into plain values, taxes are calculated
+        # before leaving the cart so that they do not need to be again
+        assert self._journal is None, 'Cannot copy within a transaction.'
+        return dict(tax_definitions=tuple(self._tax_definitions),
+                    rounding_policy=self._rounding_policy,
+                    items=tuple((ci.product.name, ci.product.price,
+                                 int(ci.product.product_source),
+                                 int(ci.product.product_category),
+                                 ci.quantity, ci.tax)
+                                for ci in self._cart_items))
+
+    def __setstate__(self, state):
+        self.__init__(state['rounding_policy'])
+        self._tax_definitions.extend(state['tax_definitions'])
+        pricer = self._get_pricer()
+        items = self._cart_items
+        for name, price, source, category, quantity, tax in state['items']:
+            product = Product(name, price, ProductSource(source),
+                              ProductCategory(category))
+            self._cart_index[product] = len(items)
+            items.append(self.CartItem(product, quantity, tax, pricer))
+            self._sub_total += quantity * price
+        self._untaxed.update(range(len(items)))
+
+    def dump(self):
+        """Serializes the cart into a compact binary format.
+
+        The format stores the names of the rounding policy, of the tax
+        definitions and of the products in a string table, and the items
+        as columns: name index, price, quantity and tax as little endian
+        integers, with amounts in cents, then category and source as one
+        byte each. Taxes are calculated before dumping, so that
+        :meth:`load` does not need to. Only the policies and definitions
+        known to their factories can be loaded back, and only prices and
+        taxes with at most two decimal places can be dumped.
+
+        :return: the serialized cart
+        :rtype: bytes
+        :raises ValueError: if a price or tax has more than two decimal
+            places
+        """
+        assert self._journal is None, 'Cannot dump within a transaction.'
+        strings = [self._rounding_policy.__class__.__name__]
+        strings.extend(td.__class__.__name__ for td in self._tax_definitions)
+        names = {}
+        name_indexes = array('I')
+        prices = array('q')
+        quantities = array('q')
+        taxes = array('q')
+        categories = bytearray()
+        sources = bytearray()
         for ci in self._cart_items:
-            tax = decimal.Decimal(0)
-            for td in self._tax_definitions:
-                _t = td.apply(ci.product) * ci.quantity
-                _t_rounded = self._rounding_policy.apply(_t)
-                tax += _t_rounded
-            ci.tax = tax
+            product = ci.product
+            try:
+                name_index = names[product.name]
+            except KeyError:
+                name_index = names[product.name] = len(strings)
+                strings.append(product.name)
+            name_indexes.append(name_index)
+            prices.append(_dump_cents(product.price))
+            quantities.append(ci.quantity)
+            taxes.append(_dump_cents(ci.tax))
+            categories.append(product.product_category)
+            sources.append(product.product_source)
+
+        encoded = [string.encode('utf-8') for string in strings]
+        columns = [array('I', map(len, encoded)), name_indexes, prices,
+                   quantities, taxes]
+        if sys.byteorder == 'big':
+            for column in columns:
+                column.byteswap()
+        return b''.join([_DUMP_HEADER.pack(DUMP_MAGIC, DUMP_VERSION,
+                                           len(strings),
+                                           len(self._tax_definitions),
+                                           len(self._cart_items)),
+                         columns[0].tobytes(), b''.join(encoded)] +
+                        [column.tobytes() for column in columns[1:]] +
+                        [bytes(categories), bytes(sources)])
+
+    @classmethod
+    def load(cls, data):
+        """Creates a cart from the output of :meth:`dump`.
+
+        :param data: the serialized cart
+        :type data: bytes
+        :return: the cart, with the taxes it was dumped with
+        :rtype: Cart
+        """
+        data = memoryview(data)
+        try:
+            magic, version, string_count, definition_count, item_count = \
+                _DUMP_HEADER.unpack_from(data)
+        except struct.error:
+            raise ValueError('Not a cart dump.')
+        if magic != DUMP_MAGIC:
+            raise ValueError('Not a cart dump.')
+        if version != DUMP_VERSION:
+            raise ValueError('Unsupported cart dump version {}.'.format(
+                version))
+
+        offset = _DUMP_HEADER.size
+
+        def read(typecode, count):
+            nonlocal offset
+            column = array(typecode)
+            end = offset + column.itemsize * count
+            if end > len(data):
+                raise ValueError('Truncated cart dump.')
+            column.frombytes(data[offset:end])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            offset = end
+            return column
+
+        if string_count <= definition_count:
+            raise ValueError('Corrupted cart dump.')
+        strings = []
+        for length in read('I', string_count):
+            try:
+                strings.append(str(data[offset:offset + length], 'utf-8'))
+            except UnicodeDecodeError:
+                raise ValueError('Corrupted cart dump.')
+            offset += length
+        name_indexes = read('I', item_count)
+        prices = read('q', item_count)
+        quantities = read('q', item_count)
+        taxes = read('q', item_count)
+        categories = read('B', item_count)
+        sources = read('B', item_count)
+        if offset != len(data):
+            raise ValueError('Corrupted cart dump.')
+        product_sources = {int(e): e for e in ProductSource}
+        product_categories = {int(e): e for e in ProductCategory}
+        # Product names follow the policy and definition names
+        if item_count and (min(name_indexes) <= definition_count or
+                           max(name_indexes) >= string_count or
+                           min(quantities) <= 0 or min(prices) < 0 or
+                           not product_categories.keys() >= set(categories)
+                           or not product_sources.keys() >= set(sources)):
+            raise ValueError('Corrupted cart dump.')
+
+        try:
+            cart = cls(RoundingPolicyFactory.create_policy(strings[0]))
+            cart._tax_definitions.extend(
+                TaxDefinitionFactory.create_definition(name)
+                for name in strings[1:definition_count + 1])
+        except KeyError as e:
+            raise ValueError('Unknown rounding policy or tax definition '
+                             '{}.'.format(e))
+        pricer = cart._get_pricer()
+        items = cart._cart_items
+        index = cart._cart_index
+        # Amounts repeat a lot, they are converted once
+        amounts = {}
+        for cents in set(prices).union(taxes):
+            amounts[cents] = from_cents(cents)
+        if not definition_count:
+            # Taxes are plain zeros without any tax definition
+            taxes = [None] * item_count
+            amounts[None] = decimal.Decimal(0)
+        for name_index, price, quantity, tax, category, source in zip(
+                name_indexes, prices, quantities, taxes, categories, sources):
+            product = Product(strings[name_index], amounts[price],
+                              product_sources[source],
+                              product_categories[category])
+            index[product] = len(items)
+            items.append(cls.CartItem(product, quantity, amounts[tax],
+                                      pricer))
+        if len(index) != len(items):
+            raise ValueError('Corrupted cart dump, duplicate products.')
+        if items:
+            cart._sub_total = from_cents(sum(
+                price * quantity for price, quantity in zip(prices,
+                                                            quantities)))
+            if definition_count:
+                cart._tax_total = from_cents(sum(taxes))
+        return cart
+
+    def split(self, parts):
+        """Splits the cart into carts of consecutive items.
+
+        The items are shared, not copied, and keep their taxes. Merging the
+        parts back in order results in this cart.
+
+        :param parts: number of carts
+        :type parts: int
+        :return: carts holding about the same number of items each
+        :rtype: list
+        """
+        assert parts > 0
+        assert self._journal is None, 'Cannot split within a transaction.'
+        items = self._cart_items
+        bounds = [len(items) * part // parts for part in range(parts + 1)]
+        carts = []
+        for start, end in zip(bounds, bounds[1:]):
+            cart = self._empty_copy()
+            cart._cart_items = items[start:end]
+            for position, ci in enumerate(cart._cart_items):
+                cart._cart_index[ci.product] = position
+                cart._sub_total += ci.sub_total
+            cart._untaxed.update(range(end - start))
+            carts.append(cart)
+        return carts
+
+    def _same_rules(self, other):
+        """Tells whether another cart calculates the same taxes.
+
+        :param other: another cart
+        :type other: Cart
+        :return: whether both carts have the same rates and rounding
+        :rtype: bool
+        """
+        table, rounding_policy = self._get_pricer()
+        other_table, other_rounding_policy = other._get_pricer()
+        return (table is other_table or
+                table.get_all_rates() == other_table.get_all_rates()) and \
+            (rounding_policy is other_rounding_policy or
+             type(rounding_policy) is type(other_rounding_policy))
+
+    def _calculate_taxes(self, positions=None):
+        """Applies the current tax rules to the given cart items
+
+        Compiles the configured tax rules, which rejects invalid tax
+        definitions, and rebinds the cart items at the given positions (all
+        items by default) priced with outdated rules. Item taxes are
+        calculated lazily on first access, and added to the tax total by
+        :meth:`_evaluate_taxes`.
+
+        :param positions: positions of the cart items affected by the change
+        :type positions: Iterable
+        :return:
+        """
+        if positions is None:
+            positions = range(len(self._cart_items))
+        pricer = self._get_pricer()
+        for position in positions:
+            ci = self._cart_items[position]
+            if ci._pricer is not pricer:
+                self._set_item(position, self.CartItem(ci.product,
+                                                       ci.quantity,
+                                                       pricer=pricer))
+
+    def _evaluate_taxes(self):
+        """Adds the taxes of the untaxed cart items to the tax total.
+
+        :return:
+        """
+        items = self._cart_items
+        tax_total = self._tax_total
+        for position in self._untaxed:
+            tax_total += items[position].tax
+        self._tax_total = tax_total
+        self._log('untaxed_positions', self._untaxed)
+        self._untaxed = set()
+
+    def _untax(self, position, cart_item=None):
+        """Excludes the tax of a cart item from the tax total.
+
+        :param position: position of the cart item
+        :param cart_item: cart item leaving the position, if any
+        :type position: int
+        :type cart_item: Cart.CartItem
+        :return:
+        """
+        if position not in self._untaxed:
+            if cart_item is not None:
+                self._tax_total -= cart_item.tax
+            self._log('untaxed', position)
+            self._untaxed.add(position)
+
+    @staticmethod
+    def _calculate_item_tax(cart_item, table, rounding_policy):
+        """Calculates the rounded tax of a cart item for the given rules
+
+        :param cart_item: cart item to be taxed
+        :param table: compiled rates of the tax definitions to apply
+        :param rounding_policy: tax rounding policy
+        :type cart_item: Cart.CartItem
+        :type table: TaxRuleTable
+        :type rounding_policy: BaseRoundingPolicy
+        :return: sum of the rounded taxes
+        :rtype: decimal.Decimal
+        """
+        product = cart_item.product
+        tax = decimal.Decimal(0)
+        for rate in table.get_rates(product.product_category,
+                                    product.product_source):
+            _t = product.price * rate * cart_item.quantity
+            _t_rounded = rounding_policy.apply(_t)
+            tax += _t_rounded
+        return tax
+
+    def _get_tax_table(self):
+        """Retrieves the compiled rates of the configured tax definitions.
+
+        :return: tax rule table of this cart
+        :rtype: TaxRuleTable
+        """
+        if self._tax_table is None:
+            self._tax_table = TaxRuleTable(self._tax_definitions)
+        return self._tax_table
+
+    def _get_pricer(self):
+        """Retrieves the tax rules given to the cart items.
+
+        :return: tax rule table and rounding policy of this cart
+        :rtype: tuple
+        """
+        if self._pricer is None:
+            self._pricer = (self._get_tax_table(), self._rounding_policy)
+        return self._pricer
 
     def _get_item_or_none(self, _product):
         """Retrieves a cart item if exists or else returns None
@@ -99,49 +560,154 @@ class Cart(object):
         :return: cart item containing the product or None
         :rtype: Cart.CartItem
         """
-        for ci in self._cart_items:
-            if ci.product == _product:
-                return ci
-        return None
+        position = self._cart_index.get(_product)
+        if position is None:
+            return None
+        return self._cart_items[position]
+
+    def price_item(self, _product, quantity=1):
+        """Calculates the taxes of a product without adding it to the cart.
+
+        :param _product: Product to be priced
+        :type _product: Product
+        :param quantity: quantity of the product
+        :type quantity: int
+        :return: a cart item that is not part of this cart
+        :rtype: Cart.CartItem
+        """
+        assert isinstance(_product, Product)
+        assert quantity > 0
+        return self.CartItem(_product, quantity, pricer=self._get_pricer())
 
     def get_items(self):
-        return deepcopy(self._cart_items)
+        return list(self._cart_items)
+
+    def get_items_view(self):
+        return self.ItemsView(self._cart_items)
 
     def get_taxes(self):
-        return sum(ci.tax for ci in self._cart_items)
+        if self._untaxed:
+            self._evaluate_taxes()
+        return self._tax_total
 
     def get_sub_total(self):
-        return sum(ci.sub_total for ci in self._cart_items)
+        return self._sub_total
 
     def get_net_total(self):
-        return sum(ci.net_total for ci in self._cart_items)
+        return self._sub_total + self.get_taxes()
+
+    @contextmanager
+    def transaction(self):
+        """Groups cart changes into a single all-or-nothing operation.
+
+        Every change made to the cart within the transaction is recorded in a
+        journal. The affected items are repriced once when the transaction
+        completes. If any error occurs, the journal is replayed
+        backwards to revert the cart to its state before the transaction.
+        Nested transactions join the outermost one.
+
+            with cart.transaction():
+                cart.add_item(product_a)
+                cart.add_item(product_b, 2)
+
+        :return: this cart
+        :rtype: Cart
+        """
+        if self._journal is not None:
+            yield self
+            return
+
+        self._journal = []
+        self._dirty_items = set()
+        self._new_definitions = []
+        pre_totals = (self._sub_total, self._tax_total)
+        try:
+            yield self
+            self._commit()
+        except BaseException:
+            self._rollback()
+            self._sub_total, self._tax_total = pre_totals
+            raise
+        finally:
+            self._journal = None
+            self._dirty_items = None
+            self._new_definitions = None
+
+    def _commit(self):
+        """Reprices the cart items affected by the current transaction.
+
+        Every item is affected by newly added tax definitions, otherwise
+        only the changed items are.
+
+        :return:
+        """
+        if self._new_definitions:
+            self._calculate_taxes()
+        elif self._dirty_items:
+            self._calculate_taxes(sorted(self._dirty_items))
+
+    def _rollback(self):
+        """Reverts the changes recorded in the journal, newest first.
+
+        :return:
+        """
+        for entry in reversed(self._journal):
+            action = entry[0]
+            if action == 'append_item':
+                ci = self._cart_items.pop()
+                del self._cart_index[ci.product]
+            elif action == 'append_definition':
+                self._tax_definitions.pop()
+                self._tax_table, self._pricer = entry[1:]
+            elif action == 'item':
+                self._cart_items[entry[1]] = entry[2]
+            elif action == 'untaxed':
+                self._untaxed.discard(entry[1])
+            elif action == 'untaxed_positions':
+                self._untaxed = entry[1]
+
+    def _log(self, action, *args):
+        """Records a change in the journal of the current transaction.
+
+        :param action: kind of the change
+        :param args: information required to revert the change
+        :type action: str
+        :return:
+        """
+        if self._journal is not None:
+            self._journal.append((action,) + args)
+
+    def _set_item(self, position, item):
+        """Replaces the cart item at a position.
+
+        :param position: position of the cart item
+        :param item: new cart item
+        :type position: int
+        :type item: Cart.CartItem
+        :return:
+        """
+        old_item = self._cart_items[position]
+        self._log('item', position, old_item)
+        self._cart_items[position] = item
+        self._untax(position, old_item)
 
     def _recalculate(fn, *args, **kwargs):
         """Recalculate cart taxes.
 
         A decorator method to recalculate cart state whenever state is changed.
-        Ensures that cart is always in a valid state by accounting for runtime
-        errors and reverting back to original cart state if the operation
-        failed.
+        Ensures that cart is always in a valid state by running the wrapped
+        method in a transaction, reverting back to original cart state if the
+        operation failed.
 
         :param args:
         :param kwargs:
         :return:
         """
         def _wrapped(self, *args, **kwargs):
-            pre_cart_state = deepcopy(self._cart_items)
-            pre_cart_tax = deepcopy(self._tax_definitions)
-            try:
+            with self.transaction():
                 fn(self, *args, **kwargs)
-                self._calculate_taxes()
-            except (AssertionError, NotImplementedError):
-                # TODO: Granular exception handling
-                self._cart_items = pre_cart_state
-                self._tax_definitions = pre_cart_tax
-                raise
         return _wrapped
 
-
     @_recalculate
     def add_tax_definition(self, tax_definition):
         """Adds a tax definition to be considered for item tax calculation
@@ -151,7 +717,11 @@ class Cart(object):
         :return:
         """
         assert isinstance(tax_definition, BaseTaxDefinition)
+        self._log('append_definition', self._tax_table, self._pricer)
         self._tax_definitions.append(tax_definition)
+        self._tax_table = None
+        self._pricer = None
+        self._new_definitions.append(tax_definition)
 
     @_recalculate
     def add_item(self, _product, quantity=1):
@@ -160,6 +730,73 @@ class Cart(object):
         A new cart item will be created with the given quantity or existing
         product's cart item quantity will be increased  by the given amount.
 
+        :param _product: Product that requires quantity change
+        :type _product: Product
+        :param quantity: Amount of change that is needed in quantity
+        :type quantity: int
+        :return:
+        """
+        self._add_item(_product, quantity)
+
+    @_recalculate
+    def add_items(self, items):
+        """Adds several products to the cart as a single operation.
+
+        Behaves like calling :meth:`add_item` for each pair, but taxes are
+        recalculated once at the end and either every item is added or,
+        if any of them is invalid, none of them are.
+
+        :param items: pairs of product and quantity
+        :type items: Iterable
+        :return:
+        """
+        for _product, quantity in items:
+            self._add_item(_product, quantity)
+
+    @_recalculate
+    def merge(self, other):
+        """Adds the items of another cart to this cart.
+
+        Duplicate products are combined into a single cart item which is
+        taxed again, as taxes are rounded per item. The taxes of the other
+        items are kept when both carts apply the same tax rules, so that
+        merging the carts priced from consecutive parts of an order gives
+        the same items, taxes and order as pricing the whole order at once.
+
+        :param other: cart to take the items from, it is not changed
+        :type other: Cart
+        :return:
+        """
+        assert isinstance(other, Cart) and other is not self
+        same_rules = self._same_rules(other)
+        pricer = self._get_pricer()
+        for ci in other._cart_items:
+            if same_rules and ci.product not in self._cart_index:
+                self._append_item(self.CartItem(ci.product, ci.quantity,
+                                                ci._tax, pricer))
+                self._sub_total += ci.sub_total
+            else:
+                self._add_item(ci.product, ci.quantity)
+
+    def _append_item(self, cart_item):
+        """Appends a cart item of a new product.
+
+        :param cart_item: the cart item
+        :type cart_item: Cart.CartItem
+        :return: position of the cart item
+        :rtype: int
+        """
+        position = len(self._cart_items)
+        self._log('append_item')
+        self._cart_items.append(cart_item)
+        self._cart_index[cart_item.product] = position
+        self._untax(position)
+        self._dirty_items.add(position)
+        return position
+
+    def _add_item(self, _product, quantity):
+        """Changes the quantity of a product within the current transaction.
+
         :param _product: Product that requires quantity change
         :type _product: Product
         :param quantity: Amount of change that is needed in quantity
@@ -169,9 +806,94 @@ class Cart(object):
         assert isinstance(_product, Product)
         assert quantity > 0
 
-        item = self._get_item_or_none(_product)
-        if item is None:
-            item = self.CartItem(product=_product, quantity=0)
-            self._cart_items.append(item)
+        position = self._cart_index.get(_product)
+        if position is None:
+            self._append_item(self.CartItem(_product, quantity,
+                                            pricer=self._get_pricer()))
+        else:
+            item = self._cart_items[position]
+            self._set_item(position,
+                           item._replace(quantity=item.quantity + quantity))
+            self._dirty_items.add(position)
+
+        self._sub_total += quantity * _product.price
+
+
+class CartPool(object):
+    """Reuses carts created from a tax profile.
+
+    Carts are taken with :meth:`acquire` and handed back with
+    :meth:`release`, which resets them for the next order. At most
+    `maxsize` idle carts are kept. Carts whose tax definitions were changed
+    no longer match the profile and are not reused. A cart is only lent to
+    one user at a time, so a pool can be shared by several threads.
+
+        with pool.cart() as cart:
+            cart.add_items(items)
+            receipt_printer(cart)
+
+    """
+
+    def __init__(self, tax_profile, maxsize=64):
+        """Initialize an empty pool.
+
+        :param tax_profile: tax profile applied by the carts of the pool
+        :param maxsize: maximum number of idle carts kept
+        :type tax_profile: TaxProfile
+        :type maxsize: int
+        :return:
+        """
+        assert maxsize > 0
+        self._tax_profile = tax_profile
+        self._maxsize = maxsize
+        self._carts = []
+
+    def __len__(self):
+        return len(self._carts)
+
+    def acquire(self):
+        """Takes an empty cart from the pool, or creates one.
+
+        :return: an empty cart
+        :rtype: Cart
+        """
+        try:
+            return self._carts.pop()
+        except IndexError:
+            return Cart.from_profile(self._tax_profile)
 
-        item.quantity += quantity
+    def release(self, cart):
+        """Resets a cart and hands it back to the pool.
+
+        The cart must not be used by the caller afterwards.
+
+        :param cart: cart taken from the pool
+        :type cart: Cart
+        :return:
+        """
+        if len(self._carts) < self._maxsize and \
+                cart._tax_table is self._tax_profile.tax_table:
+            cart.reset()
+            self._carts.append(cart)
+
+    @contextmanager
+    def cart(self):
+        """Lends a cart for the duration of a `with` block.
+
+        :return: an empty cart
+        :rtype: Cart
+        """
+        cart = self.acquire()
+        try:
+            yield cart
+        finally:
+            self.release(cart)
+
+
+def _dump_cents(value):
+    # Amounts are dumped as whole cents, extra decimal places would be lost
+    cents = value.scaleb(2)
+    if cents != cents.to_integral_value():
+        raise ValueError('Cannot dump {}, amounts are limited to two decimal '
+                         'places.'.format(value))
+    return int(cents)
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Keyword based product categorization"""
+from collections import deque
+from sales_taxes.product import ProductCategory
+
+DEFAULT_KEYWORDS = (
+    (ProductCategory.BOOKS, 'book'),
+    (ProductCategory.FOODS, 'chocolate'),
+    (ProductCategory.MEDICAL, 'headache pill'),
+)
+
+
+class KeywordCategorizer(object):
+    """Matches product names to product categories by keywords.
+
+    All keywords are compiled into an Aho-Corasick automaton so that a
+    product name is categorized in a single scan regardless of the number
+    of keywords. When several keywords occur in a name, the keyword listed
+    first in the keyword table wins.
+
+    """
+
+    def __init__(self, keywords=DEFAULT_KEYWORDS,
+                 default=ProductCategory.OTHER):
+        """Initialize with a keyword table.
+
+        :param keywords: pairs of category and keyword, in order of priority
+        :param default: category of names not matching any keyword
+        :type keywords: Iterable
+        :type default: ProductCategory
+        :return:
+        """
+        self._default = default
+        self._categories = []
+        # Trie of the keywords, node 0 being the root
+        self._goto = [{}]
+        self._fail = [0]
+        self._rank = [None]
+
+        for category, keyword in keywords:
+            assert keyword
+            self._categories.append(category)
+            self._insert(keyword, len(self._categories) - 1)
+        self._link()
+
+    @classmethod
+    def from_file(cls, filename, **kwargs):
+        """Loads a keyword table from a file.
+
+        Each line holds a category name and a keyword separated by
+        whitespace, e.g. `MEDICAL headache pill`. Empty lines and lines
+        starting with `#` are ignored.
+
+        :param filename: path of the keyword table
+        :type filename: str
+        :return: categorizer for the keyword table
+        :rtype: KeywordCategorizer
+        """
+        keywords = []
+        with open(filename, 'r') as handle:
+            for line in handle:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                name, keyword = line.split(None, 1)
+                try:
+                    category = ProductCategory[name.upper()]
+                except KeyError:
+                    raise ValueError("Unknown product category: {}".format(
+                        name))
+                keywords.append((category, keyword))
+        return cls(keywords, **kwargs)
+
+    def _insert(self, keyword, rank):
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._rank.append(None)
+            node = next_node
+        if self._rank[node] is None or rank < self._rank[node]:
+            self._rank[node] = rank
+
+    def _link(self):
+        """Computes the failure links of the trie.
+
+        Every node also inherits the best rank of the keywords ending at its
+        failure node, so a single lookup per character reports all matches.
+
+        :return:
+        """
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                fail = self._goto[fallback].get(char, 0)
+                self._fail[child] = fail if fail != child else 0
+                inherited = self._rank[self._fail[child]]
+                if inherited is not None and (self._rank[child] is None or
+                                              inherited < self._rank[child]):
+                    self._rank[child] = inherited
+
+    def categorize(self, name):
+        """Matches a product name to its product category.
+
+        :param name: product name
+        :type name: str
+        :return: Product category for the provided product name
+        :rtype: ProductCategory
+        """
+        goto, fail, ranks = self._goto, self._fail, self._rank
+        best = None
+        node = 0
+        for char in name:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            rank = ranks[node]
+            if rank is not None and (best is None or rank < best):
+                if rank == 0:
+                    return self._categories[0]
+                best = rank
+        if best is None:
+            return self._default
+        return self._categories[best]
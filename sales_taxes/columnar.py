@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Column oriented tax calculation for very large batches of order lines"""
+from array import array
+import decimal
+import math
+from .rounding_policy import (RoundingPolicyFactory, StandardRoundingPolicy)
+from .tax_definition import TaxRuleTable
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+def to_cents(value):
+    """Converts a currency value into an integer amount of cents.
+
+    :param value: currency value with at most two decimal places
+    :type value: decimal.Decimal
+    :return: amount of cents
+    :rtype: int
+    """
+    cents = value * 100
+    assert cents == cents.to_integral_value()
+    return int(cents)
+
+
+def from_cents(cents):
+    """Converts an integer amount of cents into a currency value.
+
+    :param cents: amount of cents
+    :type cents: int
+    :return: currency value with two decimal places
+    :rtype: decimal.Decimal
+    """
+    return decimal.Decimal(int(cents)).scaleb(-2)
+
+
+class ColumnarTaxEngine(object):
+    """Taxes order lines stored as columns of integers.
+
+    Quantities and prices (in cents) are kept in :mod:`array` buffers and
+    product categories and sources as their small integer codes. Taxes are
+    calculated for whole columns at once, using NumPy when it is available,
+    and are identical to the ones :type:`Cart` calculates with
+    :type:`StandardRoundingPolicy` for the same lines.
+
+    Lines are taxed as given, duplicate products are not merged.
+
+    """
+
+    def __init__(self, tax_definitions, rounding_policy=None,
+                 use_numpy=True):
+        """Initialize with the tax rules to apply.
+
+        :param tax_definitions: tax definitions in the order of application
+        :param rounding_policy: tax rounding policy applied per definition
+            (defaults to a new :type:`StandardRoundingPolicy`)
+        :param use_numpy: whether to use NumPy if it is installed
+        :type tax_definitions: Iterable
+        :type rounding_policy: StandardRoundingPolicy
+        :type use_numpy: bool
+        :return:
+        """
+        if rounding_policy is None:
+            rounding_policy = RoundingPolicyFactory.create_policy(
+                'StandardRoundingPolicy')
+        assert isinstance(rounding_policy, StandardRoundingPolicy)
+        self._round_off = int(rounding_policy.ROUND_OFF)
+        assert 100 % self._round_off == 0
+        tax_definitions = tuple(tax_definitions)
+        self._table = TaxRuleTable(tax_definitions)
+        self._definition_count = len(tax_definitions)
+        self._use_numpy = use_numpy and numpy is not None
+
+        self.quantities = array('q')
+        self.prices = array('q')
+        self.categories = array('B')
+        self.sources = array('B')
+
+    def __len__(self):
+        return len(self.quantities)
+
+    def append(self, product, quantity=1):
+        """Adds an order line.
+
+        :param product: product of the order line
+        :param quantity: quantity of the product
+        :type product: Product
+        :type quantity: int
+        :return:
+        """
+        assert quantity > 0
+        self.quantities.append(quantity)
+        self.prices.append(to_cents(product.price))
+        self.categories.append(product.product_category)
+        self.sources.append(product.product_source)
+
+    def extend(self, items):
+        """Adds several order lines.
+
+        :param items: pairs of product and quantity
+        :type items: Iterable
+        :return:
+        """
+        for product, quantity in items:
+            self.append(product, quantity)
+
+    def _get_rate_columns(self, codes):
+        """Resolves the tax rates of each kind of product as fractions.
+
+        Rates of a tax definition are brought to a common denominator so
+        that a whole column can be taxed with integer arithmetic.
+
+        :param codes: distinct (category, source) pairs
+        :type codes: list
+        :return: per definition, the numerators for each pair and denominator
+        :rtype: list
+        """
+        ratios = [[rate.as_integer_ratio()
+                   for rate in self._table.get_rates(category, source)]
+                  for category, source in codes]
+        columns = []
+        for i in range(self._definition_count):
+            denominator = 1
+            for ratio in ratios:
+                d = ratio[i][1]
+                denominator = denominator * d // math.gcd(denominator, d)
+            numerators = [ratio[i][0] * (denominator // ratio[i][1])
+                          for ratio in ratios]
+            columns.append((numerators, denominator))
+        return columns
+
+    def calculate(self):
+        """Calculates the tax of every order line.
+
+        Tax of a line under a definition is `price * rate * quantity`
+        rounded up to the rounding policy's increment, which in cents is
+        `ceil(cents * quantity * rate * ROUND_OFF / 100) * 100 / ROUND_OFF`.
+
+        :return: tax of each line in cents
+        :rtype: array
+        """
+        if self._use_numpy:
+            return array('q', self._calculate_numpy().tobytes())
+        return self._calculate_python()
+
+    def _calculate_python(self):
+        codes = sorted(set(zip(self.categories, self.sources)))
+        columns = self._get_rate_columns(codes)
+        position = dict((code, i) for i, code in enumerate(codes))
+        increment = 100 // self._round_off
+
+        taxes = array('q')
+        for category, source, cents, quantity in zip(
+                self.categories, self.sources, self.prices, self.quantities):
+            i = position[(category, source)]
+            tax = 0
+            for numerators, denominator in columns:
+                amount = cents * quantity * numerators[i] * self._round_off
+                tax += -(-amount // (100 * denominator)) * increment
+            taxes.append(tax)
+        return taxes
+
+    def _calculate_numpy(self):
+        categories = numpy.frombuffer(self.categories, dtype=numpy.uint8)
+        sources = numpy.frombuffer(self.sources, dtype=numpy.uint8)
+        amounts = numpy.frombuffer(self.prices, dtype=numpy.int64) * \
+            numpy.frombuffer(self.quantities, dtype=numpy.int64) * \
+            self._round_off
+
+        kinds = categories.astype(numpy.int64) * 256 + sources
+        unique, inverse = numpy.unique(kinds, return_inverse=True)
+        codes = [(int(kind) // 256, int(kind) % 256) for kind in unique]
+        columns = self._get_rate_columns(codes)
+        increment = 100 // self._round_off
+
+        taxes = numpy.zeros(len(self), dtype=numpy.int64)
+        for numerators, denominator in columns:
+            rates = numpy.array(numerators, dtype=numpy.int64)[inverse]
+            taxes += -(-(amounts * rates) // (100 * denominator)) * increment
+        return taxes
+
+    def get_taxes(self):
+        return from_cents(sum(self.calculate()))
+
+    def get_sub_total(self):
+        return from_cents(sum(p * q for p, q in
+                              zip(self.prices, self.quantities)))
+
+    def get_net_total(self):
+        return self.get_sub_total() + self.get_taxes()
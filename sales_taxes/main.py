@@ -4,60 +4,149 @@
 from __future__ import print_function
 from decimal import Decimal, ROUND_DOWN
 from contextlib import contextmanager
-from sales_taxes.cart import Cart
-from sales_taxes.product import (ProductSource, ProductCategory, Product)
-from sales_taxes.tax_definition import TaxDefinitionFactory
-from sales_taxes.helpers import currencyfy
-import re
+from io import StringIO
+from sales_taxes.cart import (Cart, CartPool)
+from sales_taxes.parser import (INPUT_REGEX, parse_order, parse_orders,
+                                fuzzy_categorize, ProductCache,
+                                MappedOrderReader)
+from sales_taxes.tax_profile import TaxProfileFactory
+from sales_taxes.metrics import (Metrics, METRICS)
+from sales_taxes.receipt_writer import ReceiptWriter
+import argparse
 import sys
 
-INPUT_REGEX = '^(?P<quantity>[0-9]+)\s+' \
-              '(?P<name>(?:.*(?P<imported>imported?))?.+)\s+at\s+' \
-              '(?P<price>[0-9]*\.?[0-9]+)$'
+__all__ = ('main', 'create_cart', 'price_order', 'get_input_handle',
+           'read_order', 'receipt_printer', 'stream_receipt',
+           # Parsing moved to `sales_taxes.parser`, still available here
+           'INPUT_REGEX', 'parse_order', 'parse_orders', 'fuzzy_categorize')
 
 
-def main():
+def main(argv=None):
     """Program entry point.
 
-    Syntax: `cat input.txt | script.py`
+    Syntax: `cat input.txt | script.py [--stream] [--profile]` or
+    `script.py [--stream] [--mmap] [--profile] input.txt`
     Where `input.txt` conatains well formatted order details.
 
 
     Parses the input strings, construct the :type:`Cart` and prints out the
-    shopping list.
-
+    shopping list. With `--stream` each line is printed as soon as it is
+    parsed and only the totals are kept, for large orders that contain no
+    duplicate items. With `--mmap` the order file is memory mapped and
+    parsed without decoding whole lines. With `--profile` the time spent in
+    each stage of the pricing is printed to the standard error after the
+    receipt, `--metrics` saves it as JSON or Prometheus text.
+
+        :param argv: command line arguments (defaults to `sys.argv`)
+        :type argv: list
         :return: exit status
         :rtype: int
     """
+    parser = argparse.ArgumentParser(description='Prints a sales receipt.')
+    parser.add_argument('filename', nargs='?',
+                        help='order details (defaults to standard input)')
+    parser.add_argument('--stream', action='store_true',
+                        help='print items as they are read, without merging '
+                             'duplicate items')
+    parser.add_argument('--mmap', action='store_true',
+                        help='memory map the order file')
+    parser.add_argument('--format', choices=ReceiptWriter.FORMATS,
+                        default='text', help='receipt format')
+    parser.add_argument('--profile', action='store_true',
+                        help='print the time spent in each stage after the '
+                             'receipt')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='save the stage timings to a file')
+    parser.add_argument('--metrics-format', choices=Metrics.FORMATS,
+                        default='json', help='stage timings format')
+    args = parser.parse_args(argv)
+    if args.mmap and not args.filename:
+        parser.error('--mmap requires an order file')
+
+    profile = args.profile or args.metrics
+    if profile:
+        METRICS.reset()
+        METRICS.enable()
+    cart = create_cart()
+    with get_input_handle(args.filename, args.mmap) as handle:
+        if args.stream:
+            stream_receipt(cart, handle, format=args.format)
+        else:
+            cart.add_items(read_order(handle))
+            receipt_printer(cart, format=args.format)
+    if profile:
+        METRICS.disable()
+        if args.profile:
+            METRICS.print_breakdown(sys.stderr)
+        if args.metrics:
+            with open(args.metrics, 'w') as f:
+                METRICS.export(f, args.metrics_format)
+    return 0
 
-    cart = Cart()
 
-    # Specify tax definitions applied to the items in the cart
-    cart.add_tax_definition(TaxDefinitionFactory.
-                            create_definition('BasicTaxDefinition'))
-    cart.add_tax_definition(TaxDefinitionFactory.
-                            create_definition('ImportTaxDefinition'))
+def create_cart(tax_profile='StandardTaxProfile'):
+    """Creates a cart applying a named tax profile.
+
+    :param tax_profile: name of the tax profile
+    :type tax_profile: str
+    :return: an empty cart
+    :rtype: Cart
+    """
+    return Cart.from_profile(TaxProfileFactory.get_profile(tax_profile))
+
+
+def price_order(lines, tax_profile='StandardTaxProfile'):
+    """Prices a whole order and renders its receipt.
+
+    :param lines: formatted strings describing the order items
+    :param tax_profile: name of the tax profile
+    :type lines: Iterable
+    :type tax_profile: str
+    :return: receipt of the order
+    :rtype: str
+    """
+    profile = TaxProfileFactory.get_profile(tax_profile)
+    try:
+        pool = _cart_pools[profile]
+    except KeyError:
+        pool = _cart_pools[profile] = CartPool(profile)
+    output = StringIO()
+    cart = pool.acquire()
+    try:
+        cart.add_items(read_order(lines))
+        receipt_printer(cart, output)
+    finally:
+        pool.release(cart)
+    return output.getvalue()
 
-    with get_input_handle() as handle:
-        for line in handle:
-            quantity, product_spec = parse_order(line)
-            product = Product(**product_spec)
-            cart.add_item(product, quantity)
-    receipt_printer(cart)
-    return 0
+
+# Carts reused by `price_order`, by tax profile
+_cart_pools = {}
 
 
 @contextmanager
-def get_input_handle(filename=None):
+def get_input_handle(filename=None, mapped=False):
     """Detect the input method and retrieve a handler.
 
     Method will return a file handler (if a filename is supplied) or the
-    standard input handler.
+    standard input handler. A memory mapped reader is returned instead of
+    the file handler when `mapped` is set.
 
+    :param filename: path of the order file
+    :param mapped: whether to memory map the order file
+    :type filename: str
+    :type mapped: bool
     :return: an input handler to iterate order details from
     :rtype: Iterable
     """
-    if filename:
+    if mapped:
+        assert filename
+        reader = MappedOrderReader(filename)
+        try:
+            yield reader
+        finally:
+            reader.close()
+    elif filename:
         file = open(filename, 'r')
         try:
             yield file
@@ -67,68 +156,66 @@ def get_input_handle(filename=None):
         yield sys.stdin
 
 
-def parse_order(line):
-    """Parses a properly formatted order string.
+def read_order(lines, cache=None):
+    """Parses order strings into products.
 
-    Uses regex group matching to identify the information in the order string.
+    Repeated product descriptions share the same product instance.
 
-    :param line: formatted string describing the order item
-    :type line: str
-    :return: quantity of the order, dict object containing product details
-    :rtype: tuple
-    """
-    m = re.match(INPUT_REGEX, line)
-    try:
-        quantity = int(m.group('quantity'))
-        # Remove 'imported' from the product name capture for cleaner printing
-        name = re.sub("\s*imported\s*", ' ', m.group('name')).strip()
-        product_source = ProductSource.IMPORTED if m.group('imported')\
-            else ProductSource.LOCAL
-
-        details = dict(name=name,
-                       product_source=product_source,
-                       price=currencyfy(Decimal(m.group('price'))),
-                       product_category=fuzzy_categorize(m.group('name')))
-    except AttributeError:
-        raise Exception("Incorrect input format. Cannot parse.")
-    return quantity, details
-
-
-def fuzzy_categorize(name):
-    """Matches product names to their respective product categories
-
-     Fuzzy matching product names to product categories by checking for
-     specific keywords.
-
-    :param name: product name
-    :type name: str
-    :return: Product category for the provided product name
-    :rtype: ProductCategory
+    :param lines: formatted strings describing the order items
+    :param cache: product cache (defaults to a new cache)
+    :type lines: Iterable
+    :type cache: ProductCache
+    :return: pairs of product and quantity, one per order string
+    :rtype: Iterable
     """
-    mappings = {
-        ProductCategory.BOOKS: ('book',),
-        ProductCategory.FOODS: ('chocolate',),
-        ProductCategory.MEDICAL: ('headache pill',)
-    }
-    for category, keywords in mappings.items():
-        for keyword in keywords:
-            if keyword in name:
-                return category
-    return ProductCategory.OTHER
-
-
-def receipt_printer(cart, output=sys.stdout):
+    if cache is None:
+        cache = ProductCache()
+    if isinstance(lines, MappedOrderReader):
+        orders = lines.parse_products(cache)
+    else:
+        orders = cache.parse_orders(lines)
+    for quantity, product in orders:
+        yield product, quantity
+
+
+def receipt_printer(cart, output=sys.stdout, format='text'):
     """Prints a cart summary.
 
     :param cart: cart to print the summary from
     :param output: output handler (defaults to standard output)
+    :param format: receipt format, see :attr:`ReceiptWriter.FORMATS`
+    :type cart: Cart
+    :type format: str
+    :return:
+    """
+    ReceiptWriter(output, format).write_cart(cart)
+
+
+def stream_receipt(cart, lines, output=sys.stdout, format='text'):
+    """Prints a receipt while the order is being read.
+
+    Each order line is taxed with the rules of the cart and printed right
+    away. Only the running totals are kept, the items are not added to the
+    cart, so duplicate items are printed as separate lines.
+
+    :param cart: cart providing the tax rules
+    :param lines: formatted strings describing the order items
+    :param output: output handler (defaults to standard output)
+    :param format: receipt format, see :attr:`ReceiptWriter.FORMATS`
     :type cart: Cart
+    :type lines: Iterable
+    :type format: str
     :return:
     """
-    for ci in cart.get_items():
-        output.write("{}\n".format(ci))
-    output.write("Sales Taxes: {}\n".format(cart.get_taxes()))
-    output.write("Total: {}\n".format(cart.get_net_total()))
+    writer = ReceiptWriter(output, format)
+    taxes = Decimal(0)
+    net_total = Decimal(0)
+    for product, quantity in read_order(lines):
+        ci = cart.price_item(product, quantity)
+        writer.write_item(ci)
+        taxes += ci.tax
+        net_total += ci.net_total
+    writer.write_totals(taxes, net_total)
 
 
 if __name__ == '__main__':
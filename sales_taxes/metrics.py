@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+"""Timing of the pricing pipeline stages"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from sales_taxes import parser
+from sales_taxes.cart import Cart
+from sales_taxes.categorizer import KeywordCategorizer
+from sales_taxes.receipt_writer import ReceiptWriter
+from sales_taxes.rounding_policy import (StandardRoundingPolicy,
+                                         CeilingRoundingPolicy)
+from sales_taxes.tax_definition import TaxRuleTable
+import inspect
+import json
+import threading
+import time
+
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, float('inf'))
+
+# Functions timed as each stage: owner, attribute name, stage. Generator
+# functions are timed per produced item.
+STAGES = (
+    (parser, 'parse_order', 'parse_order'),
+    (parser.ProductCache, 'parse_order', 'parse_order'),
+    (parser.MappedOrderReader, 'parse_orders', 'parse_order'),
+    (parser.MappedOrderReader, 'parse_products', 'parse_order'),
+    (KeywordCategorizer, 'categorize', 'fuzzy_categorize'),
+    (Cart, '_add_item', 'add_item'),
+    (Cart, '_commit', 'commit'),
+    (Cart, '_rollback', 'rollback'),
+    (Cart, '_calculate_taxes', 'calculate_taxes'),
+    (Cart, '_evaluate_taxes', 'evaluate_taxes'),
+    (Cart, '_calculate_item_tax', 'calculate_taxes'),
+    (ReceiptWriter, 'write_totals', 'receipt_printer'),
+)
+
+# Functions timed as part of the next call of a stage, e.g. the items of a
+# receipt are counted with its totals, as one rendered receipt
+PARTIAL_STAGES = (
+    (ReceiptWriter, 'write_item', 'receipt_printer'),
+    (ReceiptWriter, 'write_items', 'receipt_printer'),
+)
+
+# Rounding policies whose calls are timed per tax definition
+ROUNDING_POLICIES = (StandardRoundingPolicy, CeilingRoundingPolicy)
+
+# Marks the end of a timed generator
+_DONE = object()
+# Tax definitions left to time when no rates were looked up
+_NO_DEFINITIONS = iter(())
+
+
+class Histogram(object):
+    """Number of observations per bucket, with their count and sum."""
+    __slots__ = ('buckets', 'count', 'sum')
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        return dict(count=self.count, sum=self.sum,
+                    buckets=dict(zip(map(_format_bound, BUCKETS),
+                                     self.buckets)))
+
+
+class Metrics(object):
+    """Collects call counts and timing histograms of the pricing stages.
+
+    While disabled the pipeline runs its original, uninstrumented functions,
+    so there is no overhead at all. Enabling replaces the functions listed
+    in :data:`STAGES` by timed wrappers. The time of a stage excludes the
+    time of the stages it calls, e.g. the categorization of a product while
+    parsing its order string, or the lazy tax calculation of the items while
+    printing a receipt. The time of the functions listed in
+    :data:`PARTIAL_STAGES` is added to the next call of their stage instead
+    of being counted as calls of their own. The tax of each cart item is
+    also timed per tax definition: every rounding following a lookup of the
+    rates of a :type:`TaxRuleTable` is attributed to the next definition of
+    the table.
+
+        with METRICS.profiling():
+            cart.add_items(read_order(lines))
+        METRICS.export(sys.stderr, 'prometheus')
+
+    """
+    FORMATS = ('json', 'prometheus')
+
+    def __init__(self, stages=STAGES, partial_stages=PARTIAL_STAGES):
+        """Initialize disabled, without any observations.
+
+        :param stages: owner, attribute name and stage of each timed function
+        :param partial_stages: owner, attribute name and stage of each
+            function timed as part of the next call of the stage
+        :type stages: Iterable
+        :type partial_stages: Iterable
+        :return:
+        """
+        self._stages = tuple(stages)
+        self._partial_stages = tuple(partial_stages)
+        self._originals = None
+        self._local = threading.local()
+        self.reset()
+
+    @property
+    def enabled(self):
+        return self._originals is not None
+
+    def reset(self):
+        """Discards every observation.
+
+        :return:
+        """
+        self.stages = {}
+        self.tax_definitions = {}
+        self._local.pending = {}
+
+    def enable(self):
+        """Instruments the pipeline.
+
+        :return:
+        """
+        if self.enabled:
+            return
+        self._originals = []
+        for owner, name, stage in self._stages:
+            original = owner.__dict__[name]
+            if isinstance(original, staticmethod):
+                self._patch(owner, name, staticmethod(
+                    self._timed(original.__func__, stage)))
+            elif inspect.isgeneratorfunction(original):
+                self._patch(owner, name, self._timed_generator(original,
+                                                               stage))
+            else:
+                self._patch(owner, name, self._timed(original, stage))
+        for owner, name, stage in self._partial_stages:
+            self._patch(owner, name,
+                        self._timed(owner.__dict__[name], stage, True))
+        self._patch(TaxRuleTable, 'get_rates',
+                    self._tracked_rates(TaxRuleTable.__dict__['get_rates']))
+        for policy in ROUNDING_POLICIES:
+            self._patch(policy, 'apply',
+                        self._timed_rounding(policy.__dict__['apply']))
+
+    def _patch(self, owner, name, wrapper):
+        self._originals.append((owner, name, owner.__dict__[name]))
+        setattr(owner, name, wrapper)
+
+    def disable(self):
+        """Restores the original, uninstrumented pipeline.
+
+        :return:
+        """
+        if not self.enabled:
+            return
+        for owner, name, original in reversed(self._originals):
+            setattr(owner, name, original)
+        self._originals = None
+
+    @contextmanager
+    def profiling(self):
+        """Instruments the pipeline for the duration of a `with` block.
+
+        :return: this collector
+        :rtype: Metrics
+        """
+        enabled = self.enabled
+        self.enable()
+        try:
+            yield self
+        finally:
+            if not enabled:
+                self.disable()
+
+    def observe(self, stage, seconds):
+        """Records the duration of a call of a stage.
+
+        :param stage: name of the stage
+        :param seconds: duration of the call
+        :type stage: str
+        :type seconds: float
+        :return:
+        """
+        try:
+            histogram = self.stages[stage]
+        except KeyError:
+            histogram = self.stages[stage] = Histogram()
+        histogram.observe(seconds)
+
+    def observe_tax_definition(self, tax_definition, seconds):
+        """Records the duration of rounding the tax of a tax definition.
+
+        :param tax_definition: the applied tax definition
+        :param seconds: duration of the rounding
+        :type tax_definition: BaseTaxDefinition
+        :type seconds: float
+        :return:
+        """
+        name = tax_definition.__class__.__name__
+        try:
+            histogram = self.tax_definitions[name]
+        except KeyError:
+            histogram = self.tax_definitions[name] = Histogram()
+        histogram.observe(seconds)
+
+    def _nested_time(self):
+        # Time spent in nested stages, one entry per running stage
+        try:
+            return self._local.nested
+        except AttributeError:
+            self._local.nested = []
+            return self._local.nested
+
+    def _pending_time(self):
+        # Time of partial stages not observed yet, by stage
+        try:
+            return self._local.pending
+        except AttributeError:
+            self._local.pending = {}
+            return self._local.pending
+
+    def _timed(self, fn, stage, partial=False):
+        metrics = self
+
+        @wraps(fn)
+        def _wrapped(*args, **kwargs):
+            nested = metrics._nested_time()
+            nested.append(0.0)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                inner = nested.pop()
+                if nested:
+                    nested[-1] += elapsed
+                pending = metrics._pending_time()
+                if partial:
+                    pending[stage] = pending.get(stage, 0.0) + elapsed - inner
+                else:
+                    metrics.observe(stage, elapsed - inner +
+                                    pending.pop(stage, 0.0))
+        return _wrapped
+
+    def _timed_generator(self, fn, stage):
+        metrics = self
+
+        @wraps(fn)
+        def _wrapped(*args, **kwargs):
+            iterator = fn(*args, **kwargs)
+            try:
+                while True:
+                    nested = metrics._nested_time()
+                    nested.append(0.0)
+                    start = time.perf_counter()
+                    try:
+                        item = next(iterator, _DONE)
+                    finally:
+                        elapsed = time.perf_counter() - start
+                        inner = nested.pop()
+                        if nested:
+                            nested[-1] += elapsed
+                    if item is _DONE:
+                        return
+                    metrics.observe(stage, elapsed - inner)
+                    yield item
+            finally:
+                iterator.close()
+        return _wrapped
+
+    def _tracked_rates(self, get_rates):
+        local = self._local
+
+        @wraps(get_rates)
+        def _wrapped(table, product_category, product_source):
+            # The rates are rounded next, one per definition in this order
+            local.definitions = iter(table.tax_definitions)
+            return get_rates(table, product_category, product_source)
+        return _wrapped
+
+    def _timed_rounding(self, apply):
+        metrics = self
+        local = self._local
+
+        @wraps(apply)
+        def _wrapped(rounding_policy, value):
+            definitions = getattr(local, 'definitions', _NO_DEFINITIONS)
+            tax_definition = next(definitions, None)
+            if tax_definition is None:
+                return apply(rounding_policy, value)
+            start = time.perf_counter()
+            try:
+                return apply(rounding_policy, value)
+            finally:
+                metrics.observe_tax_definition(
+                    tax_definition, time.perf_counter() - start)
+        return _wrapped
+
+    def snapshot(self):
+        """Retrieves the observations.
+
+        :return: histogram of each stage and of each tax definition
+        :rtype: dict
+        """
+        return dict(stages={name: h.to_dict()
+                            for name, h in self.stages.items()},
+                    tax_definitions={name: h.to_dict()
+                                     for name, h in
+                                     self.tax_definitions.items()})
+
+    def export(self, output, format='json'):
+        """Writes the observations.
+
+        :param output: output handler
+        :param format: one of :attr:`FORMATS`, `prometheus` being the
+            Prometheus text exposition format
+        :type format: str
+        :return:
+        """
+        assert format in self.FORMATS
+        if format == 'json':
+            json.dump(self.snapshot(), output, indent=2, sort_keys=True)
+            output.write("\n")
+        else:
+            output.write(''.join(
+                _prometheus_histogram(
+                    'sales_taxes_stage_seconds', 'stage', self.stages,
+                    'Time spent in each pricing stage, excluding nested '
+                    'stages.') +
+                _prometheus_histogram(
+                    'sales_taxes_tax_definition_seconds', 'definition',
+                    self.tax_definitions,
+                    'Time spent rounding the tax of each tax '
+                    'definition.')))
+
+    def print_breakdown(self, output):
+        """Prints the time spent in each stage.
+
+        :param output: output handler
+        :return:
+        """
+        total = sum(h.sum for h in self.stages.values()) or 1.0
+        output.write("{:<20} {:>10} {:>12} {:>10} {:>7}\n".format(
+            'Stage', 'Calls', 'Total ms', 'Mean us', 'Share'))
+        for title, histograms in (('', self.stages),
+                                  ('Tax definitions:\n',
+                                   self.tax_definitions)):
+            if title and histograms:
+                output.write(title)
+            for name, h in sorted(histograms.items(),
+                                  key=lambda i: -i[1].sum):
+                output.write(
+                    "{:<20} {:>10} {:>12.3f} {:>10.3f} {:>6.1f}%\n".format(
+                        name, h.count, h.sum * 1e3, h.sum / h.count * 1e6,
+                        h.sum / total * 100))
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def _prometheus_histogram(metric, label, histograms, description):
+    lines = ["# HELP {} {}\n".format(metric, description),
+             "# TYPE {} histogram\n".format(metric)]
+    for name, h in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS, h.buckets):
+            cumulative += count
+            lines.append('{}_bucket{{{}="{}",le="{}"}} {}\n'.format(
+                metric, label, name, _format_bound(bound), cumulative))
+        lines.append('{}_sum{{{}="{}"}} {!r}\n'.format(metric, label, name,
+                                                       h.sum))
+        lines.append('{}_count{{{}="{}"}} {}\n'.format(metric, label, name,
+                                                       h.count))
+    return lines
+
+
+METRICS = Metrics()
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""Order string parsing"""
+from collections import OrderedDict
+from decimal import Decimal
+from sales_taxes.product import (ProductSource, Product)
+from sales_taxes.categorizer import KeywordCategorizer
+from sales_taxes.helpers import currencyfy
+import mmap
+import re
+
+INPUT_REGEX = r'^(?P<quantity>[0-9]+)\s+' \
+              r'(?P<name>(?:.*(?P<imported>imported?))?.+)\s+at\s+' \
+              r'(?P<price>[0-9]*\.?[0-9]+)$'
+
+ORDER_PATTERN = re.compile(INPUT_REGEX)
+# Matched from the start of each line of a bytes buffer, `^` would only match
+# at the very beginning of the buffer
+BYTES_ORDER_PATTERN = re.compile(INPUT_REGEX[1:].encode('ascii'))
+IMPORTED_PATTERN = re.compile(r'\s*imported\s*')
+
+DEFAULT_CATEGORIZER = KeywordCategorizer()
+
+
+def parse_order(line, categorizer=DEFAULT_CATEGORIZER):
+    """Parses a properly formatted order string.
+
+    Uses regex group matching to identify the information in the order string.
+
+    :param line: formatted string describing the order item
+    :param categorizer: categorizer matching product names to categories
+    :type line: str
+    :type categorizer: KeywordCategorizer
+    :return: quantity of the order, dict object containing product details
+    :rtype: tuple
+    """
+    quantity, raw_name, imported, price = _match_order(line)
+    return int(quantity), _product_details(raw_name, imported,
+                                           currencyfy(Decimal(price)),
+                                           categorizer)
+
+
+def _match_order(line):
+    m = ORDER_PATTERN.match(line)
+    if m is None:
+        raise Exception("Incorrect input format. Cannot parse.")
+    return m.group('quantity', 'name', 'imported', 'price')
+
+
+def _product_details(raw_name, imported, price, categorizer):
+    if imported:
+        # Remove 'imported' from the product name capture for cleaner
+        # printing. Names that are not flagged never contain it.
+        name = IMPORTED_PATTERN.sub(' ', raw_name).strip()
+        product_source = ProductSource.IMPORTED
+    else:
+        name = raw_name.strip()
+        product_source = ProductSource.LOCAL
+
+    return dict(name=name,
+                product_source=product_source,
+                price=price,
+                product_category=categorizer.categorize(raw_name))
+
+
+def parse_orders(lines, categorizer=DEFAULT_CATEGORIZER):
+    """Parses a sequence of properly formatted order strings.
+
+    :param lines: formatted strings describing the order items
+    :param categorizer: categorizer matching product names to categories
+    :type lines: Iterable
+    :type categorizer: KeywordCategorizer
+    :return: quantity of the order and product details, one per string
+    :rtype: Iterable
+    """
+    for line in lines:
+        yield parse_order(line, categorizer)
+
+
+class ProductCache(object):
+    """Bounded LRU cache of products by their order specification.
+
+    Order strings describing the same product (same name text and price
+    text) share a single :type:`Product` instance, which skips parsing the
+    product details again and makes merging duplicate cart items cheap.
+    Shared products must not be modified.
+
+    """
+
+    def __init__(self, maxsize=10000, categorizer=DEFAULT_CATEGORIZER):
+        """Initialize an empty cache.
+
+        :param maxsize: maximum number of cached products
+        :param categorizer: categorizer matching product names to categories
+        :type maxsize: int
+        :type categorizer: KeywordCategorizer
+        :return:
+        """
+        assert maxsize > 0
+        self._maxsize = maxsize
+        self.categorizer = categorizer
+        self._products = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._products)
+
+    def parse_order(self, line):
+        """Parses a properly formatted order string into a product.
+
+        :param line: formatted string describing the order item
+        :type line: str
+        :return: quantity of the order, product
+        :rtype: tuple
+        """
+        quantity, raw_name, imported, price = _match_order(line)
+        key = (raw_name, price)
+        product = self.get(key)
+        if product is None:
+            product = Product(**_product_details(raw_name, imported,
+                                                 currencyfy(Decimal(price)),
+                                                 self.categorizer))
+            self.put(key, product)
+        return int(quantity), product
+
+    def get(self, key):
+        """Retrieves a cached product.
+
+        :param key: raw product name and price of the order string
+        :type key: tuple
+        :return: the cached product or None
+        :rtype: Product
+        """
+        try:
+            product = self._products[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._products.move_to_end(key)
+        return product
+
+    def put(self, key, product):
+        """Caches a product, evicting the least recently used one if full.
+
+        :param key: raw product name and price of the order string
+        :param product: product described by the order string
+        :type key: tuple
+        :type product: Product
+        :return:
+        """
+        self._products[key] = product
+        if len(self._products) > self._maxsize:
+            self._products.popitem(last=False)
+            self.evictions += 1
+
+    def parse_orders(self, lines):
+        """Parses a sequence of properly formatted order strings.
+
+        :param lines: formatted strings describing the order items
+        :type lines: Iterable
+        :return: quantity of the order and product, one per string
+        :rtype: Iterable
+        """
+        for line in lines:
+            yield self.parse_order(line)
+
+    def get_stats(self):
+        """Retrieves the cache counters.
+
+        :return: hits, misses, evictions and current size
+        :rtype: dict
+        """
+        return dict(hits=self.hits, misses=self.misses,
+                    evictions=self.evictions, size=len(self._products))
+
+
+class MappedOrderReader(object):
+    """Reads order strings from a memory mapped file.
+
+    Lines are matched directly in the mapped bytes and only the matched
+    product names and prices are decoded, whole lines never are. Produces
+    the same results as :func:`parse_order` for files of well formatted
+    UTF-8 order strings, with the exception of non-ASCII whitespace which
+    is not treated as a separator.
+
+    """
+
+    def __init__(self, filename):
+        """Map a file in memory.
+
+        :param filename: path of the order file
+        :type filename: str
+        :return:
+        """
+        self._file = open(filename, 'rb')
+        try:
+            self._buffer = mmap.mmap(self._file.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._buffer = b''
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        self._file.close()
+
+    def _lines(self):
+        """Locates the lines of the file without copying them.
+
+        :return: start and end offset of each line, without line endings
+        :rtype: Iterable
+        """
+        buf = self._buffer
+        size = len(buf)
+        start = 0
+        while start < size:
+            end = buf.find(b'\n', start)
+            if end == -1:
+                end = next_start = size
+            else:
+                next_start = end + 1
+            if end > start and buf[end - 1] == 13:  # \r
+                end -= 1
+            yield start, end
+            start = next_start
+
+    def __iter__(self):
+        buf = self._buffer
+        for start, end in self._lines():
+            yield buf[start:end].decode('utf-8') + '\n'
+
+    def _match_orders(self):
+        buf = self._buffer
+        match = BYTES_ORDER_PATTERN.match
+        for start, end in self._lines():
+            m = match(buf, start, end)
+            if m is None:
+                raise Exception("Incorrect input format. Cannot parse.")
+            yield m.group('quantity', 'name', 'imported', 'price')
+
+    def parse_orders(self, categorizer=DEFAULT_CATEGORIZER):
+        """Parses every order string of the file.
+
+        :param categorizer: categorizer matching product names to categories
+        :type categorizer: KeywordCategorizer
+        :return: quantity of the order and product details, one per line
+        :rtype: Iterable
+        """
+        for quantity, raw_name, imported, price in self._match_orders():
+            yield int(quantity), _product_details(raw_name.decode('utf-8'),
+                                                  imported,
+                                                  _decode_price(price),
+                                                  categorizer)
+
+    def parse_products(self, cache):
+        """Parses every order string of the file into shared products.
+
+        :param cache: product cache
+        :type cache: ProductCache
+        :return: quantity of the order and product, one per line
+        :rtype: Iterable
+        """
+        for quantity, raw_name, imported, price in self._match_orders():
+            key = (raw_name, price)
+            product = cache.get(key)
+            if product is None:
+                product = Product(**_product_details(
+                    raw_name.decode('utf-8'), imported,
+                    _decode_price(price), cache.categorizer))
+                cache.put(key, product)
+            yield int(quantity), product
+
+
+def _decode_price(price):
+    # Converting the few price bytes through the C decimal implementation is
+    # faster than assembling the cents in Python
+    return currencyfy(Decimal(price.decode('ascii')))
+
+
+def fuzzy_categorize(name):
+    """Matches product names to their respective product categories
+
+     Fuzzy matching product names to product categories by checking for
+     specific keywords.
+
+    :param name: product name
+    :type name: str
+    :return: Product category for the provided product name
+    :rtype: ProductCategory
+    """
+    return DEFAULT_CATEGORIZER.categorize(name)
@@ -1,20 +1,73 @@
 # -*- coding: utf-8 -*-
-from . import helpers
 import decimal
-ProductSource = helpers.enum('ProductSource', 'LOCAL', 'IMPORTED')
-ProductCategory = helpers.enum('ProductCategory',
-                               'BOOKS', 'FOODS', 'MEDICAL', 'OTHER')
+import enum
+
+
+class ProductSource(enum.IntEnum):
+    LOCAL = 0
+    IMPORTED = 1
+
+
+class ProductCategory(enum.IntEnum):
+    BOOKS = 0
+    FOODS = 1
+    MEDICAL = 2
+    OTHER = 3
 
 
 class Product(object):
+    """An immutable product that can be added to the cart.
+
+    The hash of the identity key is computed once, so products are cheap to
+    compare and to look up.
+
+    """
+    __slots__ = ('name', 'price', 'product_source', 'product_category',
+                 '_hash')
 
     def __init__(self, name, price, product_source, product_category):
         assert isinstance(price, decimal.Decimal)
 
-        self.name = name
-        self.price = price
-        self.product_source = product_source
-        self.product_category = product_category
+        _set = super(Product, self).__setattr__
+        _set('name', name)
+        _set('price', price)
+        _set('product_source', product_source)
+        _set('product_category', product_category)
+        _set('_hash', hash(self.key))
+
+    @property
+    def key(self):
+        """Identity of the product used for equality and hashing.
+
+        :return: name, source, price and category of the product
+        :rtype: tuple
+        """
+        return (self.name, self.product_source,
+                self.price, self.product_category)
+
+    def replace(self, **changes):
+        """Creates a copy of the product with some attributes changed.
+
+        :param changes: new values of the attributes
+        :return: the new product
+        :rtype: Product
+        """
+        details = dict(name=self.name,
+                       price=self.price,
+                       product_source=self.product_source,
+                       product_category=self.product_category)
+        details.update(changes)
+        return self.__class__(**details)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Product is immutable.')
+
+    def __delattr__(self, name):
+        raise AttributeError('Product is immutable.')
+
+    def __reduce__(self):
+        return self.__class__, (self.name, self.price,
+                                self.product_source, self.product_category)
 
     def __str__(self):
         return "{}{}".format("imported "
@@ -22,14 +75,15 @@ class Product(object):
                              else "", self.name)
 
     def __eq__(self, other):
+        if other is self:
+            return True
         if isinstance(other, self.__class__):
-            return \
-                self.name == other.name and\
-                self.product_source == other.product_source and\
-                self.price == other.price and\
-                self.product_category == other.product_category
+            return self._hash == other._hash and self.key == other.key
         else:
             return False
 
     def __ne__(self, other):
         return not self.__eq__(other)
+
+    def __hash__(self):
+        return self._hash
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""Cache of order quotes"""
+from collections import OrderedDict
+from sales_taxes.main import (create_cart, read_order)
+from sales_taxes.receipt_writer import ReceiptWriter
+from sales_taxes.tax_profile import TaxProfileFactory
+import hashlib
+import time
+
+
+class Quote(object):
+    """The priced items and totals of an order."""
+    __slots__ = ('items', 'taxes', 'total')
+
+    def __init__(self, items, taxes, total):
+        """Initialize with the pricing of an order.
+
+        :param items: priced cart items, in receipt order
+        :param taxes: sales taxes of the order
+        :param total: total of the order
+        :type items: tuple
+        :type taxes: decimal.Decimal
+        :type total: decimal.Decimal
+        :return:
+        """
+        _set = super(Quote, self).__setattr__
+        _set('items', tuple(items))
+        _set('taxes', taxes)
+        _set('total', total)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Quote is immutable.')
+
+    def __delattr__(self, name):
+        raise AttributeError('Quote is immutable.')
+
+    def __reduce__(self):
+        return self.__class__, (self.items, self.taxes, self.total)
+
+    def render(self, output, format='text'):
+        """Writes the receipt of the quote.
+
+        :param output: output handler
+        :param format: receipt format, see :attr:`ReceiptWriter.FORMATS`
+        :type format: str
+        :return:
+        """
+        writer = ReceiptWriter(output, format)
+        writer.write_items(self.items)
+        writer.write_totals(self.taxes, self.total)
+
+
+def price_quote(lines, tax_profile='StandardTaxProfile'):
+    """Prices an order.
+
+    :param lines: formatted strings describing the order items
+    :param tax_profile: name of the tax profile
+    :type lines: Iterable
+    :type tax_profile: str
+    :return: the quote of the order
+    :rtype: Quote
+    """
+    cart = create_cart(tax_profile)
+    cart.add_items(read_order(lines))
+    return Quote(cart.get_items(), cart.get_taxes(), cart.get_net_total())
+
+
+class QuoteCache(object):
+    """Bounded LRU cache of quotes with an expiry time.
+
+    Quotes are keyed by a fingerprint of the exact text of the order lines
+    and by the tax profile. Only orders that were priced are cached, so an
+    order is never served from the cache unless the very same text parsed
+    before. The key includes the tax definitions, rates and rounding policy
+    of the profile, so quotes priced with a profile that was registered
+    again since are never returned. :meth:`invalidate` drops the quotes of
+    a profile right away.
+
+        quote = cache.get_quote(lines)
+        quote.render(sys.stdout)
+
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0, clock=time.monotonic):
+        """Initialize an empty cache.
+
+        :param maxsize: maximum number of cached quotes
+        :param ttl: seconds a quote stays valid
+        :param clock: function returning the current time in seconds
+        :type maxsize: int
+        :type ttl: float
+        :type clock: callable
+        :return:
+        """
+        assert maxsize > 0
+        assert ttl > 0
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._clock = clock
+        self._quotes = OrderedDict()
+        self._rule_keys = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._quotes)
+
+    def fingerprint(self, lines, tax_profile='StandardTaxProfile'):
+        """Computes the cache key of an order.
+
+        Lines differing in any character, whitespace included, give
+        different keys, as their parsing and receipts may differ.
+
+        :param lines: formatted strings describing the order items
+        :param tax_profile: name of the tax profile
+        :type lines: Iterable
+        :type tax_profile: str
+        :return: the cache key
+        :rtype: tuple
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for line in lines:
+            # Lengths keep the boundaries of lines containing separators
+            data = line.encode('utf-8')
+            digest.update(len(data).to_bytes(4, 'little'))
+            digest.update(data)
+        return tax_profile, self._get_rule_key(tax_profile), digest.digest()
+
+    def _get_rule_key(self, tax_profile):
+        """Identifies the tax rules of a profile by their content.
+
+        :param tax_profile: name of the tax profile
+        :type tax_profile: str
+        :return: names of the rounding policy and tax definitions, and the
+            tax rates
+        :rtype: tuple
+        """
+        profile = TaxProfileFactory.get_profile(tax_profile)
+        try:
+            return self._rule_keys[profile]
+        except KeyError:
+            rule_key = (profile.rounding_policy.__class__.__name__,
+                        tuple(td.__class__.__name__
+                              for td in profile.tax_definitions),
+                        tuple(sorted(profile.tax_table.get_all_rates().
+                                     items())))
+            self._rule_keys[profile] = rule_key
+            return rule_key
+
+    def get(self, key):
+        """Retrieves a cached quote.
+
+        :param key: cache key from :meth:`fingerprint`
+        :type key: tuple
+        :return: the cached quote, or None if missing or expired
+        :rtype: Quote
+        """
+        try:
+            expires, quote = self._quotes[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        if self._clock() >= expires:
+            del self._quotes[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._quotes.move_to_end(key)
+        return quote
+
+    def put(self, key, quote):
+        """Caches a quote, evicting the least recently used one if full.
+
+        :param key: cache key from :meth:`fingerprint`
+        :param quote: quote of the order
+        :type key: tuple
+        :type quote: Quote
+        :return:
+        """
+        self._quotes[key] = (self._clock() + self._ttl, quote)
+        self._quotes.move_to_end(key)
+        if len(self._quotes) > self._maxsize:
+            self._quotes.popitem(last=False)
+            self.evictions += 1
+
+    def get_quote(self, lines, tax_profile='StandardTaxProfile'):
+        """Retrieves the quote of an order, pricing it if not cached.
+
+        :param lines: formatted strings describing the order items
+        :param tax_profile: name of the tax profile
+        :type lines: Sequence
+        :type tax_profile: str
+        :return: the quote of the order
+        :rtype: Quote
+        """
+        key = self.fingerprint(lines, tax_profile)
+        quote = self.get(key)
+        if quote is None:
+            quote = price_quote(lines, tax_profile)
+            self.put(key, quote)
+        return quote
+
+    def invalidate(self, tax_profile=None):
+        """Drops the cached quotes of a tax profile.
+
+        :param tax_profile: name of the tax profile (defaults to every
+            profile)
+        :type tax_profile: str
+        :return:
+        """
+        if tax_profile is None:
+            self._quotes.clear()
+        else:
+            for key in [key for key in self._quotes
+                        if key[0] == tax_profile]:
+                del self._quotes[key]
+        self._rule_keys.clear()
+
+    def get_stats(self):
+        """Retrieves the cache counters.
+
+        :return: hits, misses, evictions, expirations and current size
+        :rtype: dict
+        """
+        return dict(hits=self.hits, misses=self.misses,
+                    evictions=self.evictions, expirations=self.expirations,
+                    size=len(self._quotes))
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Receipt rendering"""
+from sales_taxes.product import ProductSource
+import csv
+import io
+import json
+
+
+class ReceiptWriter(object):
+    """Renders receipts in chunks.
+
+    Receipt lines are rendered into a buffer which is written to the output
+    with a single call once `flush_size` lines have accumulated, instead of
+    one write per line. Besides the plain text receipt, CSV and JSON lines
+    formats are available for downstream systems.
+
+    """
+    FORMATS = ('text', 'csv', 'jsonl')
+
+    def __init__(self, output, format='text', flush_size=1000):
+        """Initialize with an output handler.
+
+        :param output: output handler to write the receipt to
+        :param format: one of :attr:`FORMATS`
+        :param flush_size: number of lines rendered per write
+        :type format: str
+        :type flush_size: int
+        :return:
+        """
+        assert format in self.FORMATS
+        assert flush_size > 0
+        self._output = output
+        self._flush_size = flush_size
+        self._lines = []
+        self._render_item = getattr(self, '_render_%s_item' % format)
+        self._render_totals = getattr(self, '_render_%s_totals' % format)
+        if format == 'csv':
+            self._csv_buffer = io.StringIO()
+            self._csv_writer = csv.writer(self._csv_buffer,
+                                          lineterminator='\n')
+            self._lines.append(self._render_csv_row(
+                ('quantity', 'product', 'tax', 'net_total')))
+
+    def write_item(self, cart_item):
+        """Renders a cart item.
+
+        :param cart_item: cart item to render
+        :type cart_item: Cart.CartItem
+        :return:
+        """
+        self._lines.append(self._render_item(cart_item))
+        if len(self._lines) >= self._flush_size:
+            self.flush()
+
+    def write_items(self, cart_items):
+        """Renders several cart items.
+
+        :param cart_items: cart items to render
+        :type cart_items: Iterable
+        :return:
+        """
+        lines = self._lines
+        render = self._render_item
+        flush_size = self._flush_size
+        for ci in cart_items:
+            lines.append(render(ci))
+            if len(lines) >= flush_size:
+                self.flush()
+                lines = self._lines
+
+    def write_totals(self, taxes, net_total):
+        """Renders the receipt footer and flushes the receipt.
+
+        :param taxes: sales taxes of the receipt
+        :param net_total: total of the receipt
+        :type taxes: decimal.Decimal
+        :type net_total: decimal.Decimal
+        :return:
+        """
+        self._lines.append(self._render_totals(taxes, net_total))
+        self.flush()
+
+    def write_cart(self, cart):
+        """Renders the whole receipt of a cart.
+
+        :param cart: cart to render
+        :type cart: Cart
+        :return:
+        """
+        self.write_items(cart.get_items_view())
+        self.write_totals(cart.get_taxes(), cart.get_net_total())
+
+    def flush(self):
+        if self._lines:
+            self._output.write(''.join(self._lines))
+            self._lines = []
+
+    @staticmethod
+    def _render_text_item(ci):
+        # Same as `"{}\n".format(ci)`, without the nested __str__ calls
+        product = ci.product
+        return "%d %s%s: %s\n" % (
+            ci.quantity,
+            "imported " if product.product_source == ProductSource.IMPORTED
+            else "", product.name, ci.quantity * product.price + ci.tax)
+
+    @staticmethod
+    def _render_text_totals(taxes, net_total):
+        return "Sales Taxes: {}\nTotal: {}\n".format(taxes, net_total)
+
+    def _render_csv_row(self, row):
+        self._csv_buffer.seek(0)
+        self._csv_buffer.truncate()
+        self._csv_writer.writerow(row)
+        return self._csv_buffer.getvalue()
+
+    def _render_csv_item(self, ci):
+        return self._render_csv_row((ci.quantity, ci.product, ci.tax,
+                                     ci.net_total))
+
+    def _render_csv_totals(self, taxes, net_total):
+        return self._render_csv_row(('', 'Total', taxes, net_total))
+
+    @staticmethod
+    def _render_jsonl_item(ci):
+        return json.dumps(dict(quantity=ci.quantity,
+                               product=str(ci.product),
+                               tax=str(ci.tax),
+                               net_total=str(ci.net_total))) + "\n"
+
+    @staticmethod
+    def _render_jsonl_totals(taxes, net_total):
+        return json.dumps(dict(sales_taxes=str(taxes),
+                               total=str(net_total))) + "\n"
@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from decimal import Decimal, ROUND_DOWN
+from decimal import Decimal, ROUND_CEILING, ROUND_DOWN
 import math
 from helpers import currencyfy
 
@@ -8,7 +8,8 @@ class RoundingPolicyFactory(object):
     @staticmethod
     def create_policy(policy_type):
         policies = {
-            'StandardRoundingPolicy': StandardRoundingPolicy
+            'StandardRoundingPolicy': StandardRoundingPolicy,
+            'CeilingRoundingPolicy': CeilingRoundingPolicy
         }
         return policies[policy_type]()
 
@@ -25,3 +26,20 @@ class StandardRoundingPolicy(BaseRoundingPolicy):
         _r = Decimal(math.ceil(value * self.ROUND_OFF)) / self.ROUND_OFF
         return currencyfy(_r)
 
+
+class CeilingRoundingPolicy(StandardRoundingPolicy):
+    """Rounds like :type:`StandardRoundingPolicy` with a single ceiling.
+
+    The value is scaled to a number of increments, rounded up to a whole
+    number and multiplied back by the increment, all in Decimal arithmetic.
+    This avoids the integer conversion, the division and the quantization
+    of the standard policy. Adding zero cents gives the result the two
+    decimal places of a currency value.
+
+    """
+    INCREMENT = Decimal('1') / StandardRoundingPolicy.ROUND_OFF
+    ZERO_CENTS = Decimal('0.00')
+
+    def apply(self, value):
+        increments = (value * self.ROUND_OFF).to_integral_value(ROUND_CEILING)
+        return increments * self.INCREMENT + self.ZERO_CENTS
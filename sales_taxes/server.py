@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""HTTP service pricing orders"""
+from __future__ import print_function
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from io import StringIO
+from sales_taxes.main import price_order
+from sales_taxes.quote_cache import (QuoteCache, price_quote)
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed'}
+
+
+class PricingServer(object):
+    """Prices orders received over HTTP.
+
+    `POST /price` takes order strings in the input file format as the
+    request body and responds with the receipt. `GET /stats` responds with
+    the request count and the p50/p99 latencies in milliseconds as JSON.
+
+    Each request is priced in its own cart, all carts share the compiled
+    tax profile. Orders of more than `batch_size` lines are priced in the
+    executor so that they do not block other requests. With a quote cache,
+    repeated orders are answered from the cache.
+
+    """
+
+    def __init__(self, tax_profile='StandardTaxProfile', executor=None,
+                 batch_size=200, latency_window=10000, quote_cache=None):
+        """Initialize the service.
+
+        :param tax_profile: name of the tax profile
+        :param executor: executor for large orders (defaults to the event
+            loop's default executor)
+        :param batch_size: largest order priced on the event loop
+        :param latency_window: number of latest requests in the latency
+            statistics
+        :param quote_cache: cache of the quotes of repeated orders
+        :type tax_profile: str
+        :type executor: concurrent.futures.Executor
+        :type batch_size: int
+        :type latency_window: int
+        :type quote_cache: QuoteCache
+        :return:
+        """
+        self._tax_profile = tax_profile
+        self._price_order = partial(price_order, tax_profile=tax_profile)
+        self._price_quote = partial(price_quote, tax_profile=tax_profile)
+        self._quote_cache = quote_cache
+        self._executor = executor
+        self._batch_size = batch_size
+        self._latencies = deque(maxlen=latency_window)
+        self.requests = 0
+
+    async def start(self, host='127.0.0.1', port=8000):
+        """Starts listening for requests.
+
+        :param host: address to listen on
+        :param port: port to listen on, 0 for any free port
+        :type host: str
+        :type port: int
+        :return: the listening server
+        :rtype: asyncio.AbstractServer
+        """
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader, writer):
+        """Serves a single HTTP request.
+
+        :param reader: stream of the request
+        :param writer: stream of the response
+        :type reader: asyncio.StreamReader
+        :type writer: asyncio.StreamWriter
+        :return:
+        """
+        start = time.perf_counter()
+        try:
+            try:
+                status, content_type, body = await self._respond(reader)
+            except (ValueError, asyncio.IncompleteReadError):
+                status, content_type, body = (400, 'text/plain',
+                                              'Bad request\n')
+            payload = body.encode('utf-8')
+            writer.write("HTTP/1.1 {} {}\r\n"
+                         "Content-Type: {}; charset=utf-8\r\n"
+                         "Content-Length: {}\r\n"
+                         "Connection: close\r\n\r\n".format(
+                             status, REASONS[status], content_type,
+                             len(payload)).encode('ascii') + payload)
+            await writer.drain()
+        finally:
+            # Also when the connection was reset
+            writer.close()
+            self.requests += 1
+            self._latencies.append(time.perf_counter() - start)
+
+    async def _respond(self, reader):
+        request_line = await reader.readline()
+        method, path, _ = request_line.decode('ascii').split(' ', 2)
+        length = 0
+        while True:
+            header = await reader.readline()
+            if header in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = header.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        body = await reader.readexactly(length)
+
+        if path == '/stats':
+            if method != 'GET':
+                return 405, 'text/plain', 'Method not allowed\n'
+            return 200, 'application/json', json.dumps(self.get_stats())
+        if path != '/price':
+            return 404, 'text/plain', 'Not found\n'
+        if method != 'POST':
+            return 405, 'text/plain', 'Method not allowed\n'
+
+        lines = [line for line in body.decode('utf-8').splitlines()
+                 if line.strip()]
+        try:
+            if self._quote_cache is not None:
+                receipt = await self._cached_receipt(lines)
+            elif len(lines) > self._batch_size:
+                loop = asyncio.get_running_loop()
+                receipt = await loop.run_in_executor(
+                    self._executor, self._price_order, lines)
+            else:
+                receipt = self._price_order(lines)
+        except Exception as e:
+            return 400, 'text/plain', '{}\n'.format(e)
+        return 200, 'text/plain', receipt
+
+    async def _cached_receipt(self, lines):
+        key = self._quote_cache.fingerprint(lines, self._tax_profile)
+        quote = self._quote_cache.get(key)
+        if quote is None:
+            if len(lines) > self._batch_size:
+                loop = asyncio.get_running_loop()
+                quote = await loop.run_in_executor(
+                    self._executor, self._price_quote, lines)
+            else:
+                quote = self._price_quote(lines)
+            self._quote_cache.put(key, quote)
+        output = StringIO()
+        quote.render(output)
+        return output.getvalue()
+
+    def get_stats(self):
+        """Retrieves the request count and latency percentiles.
+
+        :return: request count, p50 and p99 latency in milliseconds, and
+            the quote cache counters if any
+        :rtype: dict
+        """
+        latencies = sorted(self._latencies)
+        stats = dict(requests=self.requests,
+                     p50_ms=_percentile(latencies, 50) * 1000,
+                     p99_ms=_percentile(latencies, 99) * 1000)
+        if self._quote_cache is not None:
+            stats['quote_cache'] = self._quote_cache.get_stats()
+        return stats
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    index = int(round((len(values) - 1) * percent / 100.0))
+    return values[index]
+
+
+def main(argv=None):
+    """Service entry point.
+
+    Syntax: `script.py [--host HOST] [--port PORT] [--workers N]
+    [--quote-cache N] [--quote-ttl SECONDS]`
+
+        :param argv: command line arguments (defaults to `sys.argv`)
+        :type argv: list
+        :return: exit status
+        :rtype: int
+    """
+    parser = argparse.ArgumentParser(description='Prices orders over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes for large orders '
+                             '(defaults to the number of CPUs)')
+    parser.add_argument('--batch-size', type=int, default=200,
+                        help='largest order priced on the event loop')
+    parser.add_argument('--quote-cache', type=int, default=0,
+                        help='number of quotes of repeated orders to cache')
+    parser.add_argument('--quote-ttl', type=float, default=300.0,
+                        help='seconds a cached quote stays valid')
+    args = parser.parse_args(argv)
+
+    async def serve():
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            quote_cache = QuoteCache(args.quote_cache, args.quote_ttl) \
+                if args.quote_cache else None
+            service = PricingServer(executor=executor,
+                                    batch_size=args.batch_size,
+                                    quote_cache=quote_cache)
+            server = await service.start(args.host, args.port)
+            print("Listening on {}:{}".format(args.host, args.port),
+                  file=sys.stderr)
+            async with server:
+                await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
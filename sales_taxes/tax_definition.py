@@ -23,6 +23,10 @@ class BaseTaxDefinition(object):
         return self._calculate_product_tax(product)
 
     def _calculate_product_tax(self, product):
+        return product.price * self.get_rate(product.product_category,
+                                             product.product_source)
+
+    def get_rate(self, product_category, product_source):
         raise NotImplementedError('Method must be overridden.')
 
 
@@ -38,11 +42,11 @@ class BasicTaxDefinition(BaseTaxDefinition):
         multiplier = decimal.Decimal('0.10')
         super(BasicTaxDefinition, self).__init__(multiplier)
 
-    def _calculate_product_tax(self, product):
-        if product.product_category in self.EXEMPTIONS:
+    def get_rate(self, product_category, product_source):
+        if product_category in self.EXEMPTIONS:
             return decimal.Decimal(0)
         else:
-            return product.price * self._multiplier
+            return self._multiplier
 
 
 class ImportTaxDefinition(BaseTaxDefinition):
@@ -51,8 +55,66 @@ class ImportTaxDefinition(BaseTaxDefinition):
         multiplier = decimal.Decimal('0.05')
         super(ImportTaxDefinition, self).__init__(multiplier)
 
-    def _calculate_product_tax(self, product):
-        if product.product_source == ProductSource.IMPORTED:
-            return product.price * self._multiplier
+    def get_rate(self, product_category, product_source):
+        if product_source == ProductSource.IMPORTED:
+            return self._multiplier
         else:
             return decimal.Decimal(0)
+
+
+class TaxRuleTable(object):
+    """Tax rates of a set of tax definitions by product category and source.
+
+    Tax definitions only depend on the category and the source of a product,
+    so their rates are resolved once for every combination and reused for
+    every product sharing it.
+
+    """
+
+    def __init__(self, tax_definitions):
+        """Initialize with the tax definitions to be compiled.
+
+        :param tax_definitions: tax definitions in the order of application
+        :type tax_definitions: Iterable
+        :return:
+        """
+        self._tax_definitions = tuple(tax_definitions)
+        self._rates = {}
+        for product_category in ProductCategory:
+            for product_source in ProductSource:
+                self.get_rates(product_category, product_source)
+
+    @property
+    def tax_definitions(self):
+        """Compiled tax definitions, in the order of their rates.
+
+        :rtype: tuple
+        """
+        return self._tax_definitions
+
+    def get_all_rates(self):
+        """Retrieves the rates of every kind of product.
+
+        :return: rates of each tax definition by product category and source
+        :rtype: dict
+        """
+        return dict(self._rates)
+
+    def get_rates(self, product_category, product_source):
+        """Retrieves the rate of each tax definition for a kind of product.
+
+        :param product_category: category of the product
+        :param product_source: source of the product
+        :type product_category: ProductCategory
+        :type product_source: ProductSource
+        :return: one rate per tax definition
+        :rtype: tuple
+        """
+        key = (product_category, product_source)
+        try:
+            return self._rates[key]
+        except KeyError:
+            rates = tuple(td.get_rate(product_category, product_source)
+                          for td in self._tax_definitions)
+            self._rates[key] = rates
+            return rates
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from .rounding_policy import (RoundingPolicyFactory, BaseRoundingPolicy)
+from .tax_definition import (TaxDefinitionFactory, BaseTaxDefinition,
+                             TaxRuleTable)
+
+
+class TaxProfileFactory(object):
+    """Creates tax profiles by name and caches them.
+
+    A profile is created on first use and the same instance is returned
+    afterwards, so profiles can be shared by any number of carts.
+
+    """
+    PROFILES = {
+        'StandardTaxProfile': (('BasicTaxDefinition', 'ImportTaxDefinition'),
+                               'StandardRoundingPolicy'),
+        'CeilingTaxProfile': (('BasicTaxDefinition', 'ImportTaxDefinition'),
+                              'CeilingRoundingPolicy'),
+    }
+    _profiles = {}
+
+    @classmethod
+    def get_profile(cls, profile_name):
+        """Retrieves a named tax profile.
+
+        :param profile_name: name of the profile
+        :type profile_name: str
+        :return: the shared profile
+        :rtype: TaxProfile
+        """
+        try:
+            return cls._profiles[profile_name]
+        except KeyError:
+            td_names, policy_type = cls.PROFILES[profile_name]
+            profile = TaxProfile(
+                [TaxDefinitionFactory.create_definition(td_name)
+                 for td_name in td_names],
+                RoundingPolicyFactory.create_policy(policy_type))
+            cls._profiles[profile_name] = profile
+            return profile
+
+    @classmethod
+    def register_profile(cls, profile_name, td_names, policy_type):
+        """Adds or replaces a named tax profile.
+
+        :param profile_name: name of the profile
+        :param td_names: names of the tax definitions, in order of application
+        :param policy_type: name of the rounding policy
+        :type profile_name: str
+        :type td_names: Iterable
+        :type policy_type: str
+        :return:
+        """
+        cls.PROFILES[profile_name] = (tuple(td_names), policy_type)
+        cls._profiles.pop(profile_name, None)
+
+
+class TaxProfile(object):
+    """An immutable set of tax definitions and a rounding policy.
+
+    The tax definitions are validated and compiled into a
+    :type:`TaxRuleTable` once, carts created from the profile reuse them
+    without any per cart setup.
+
+    """
+    __slots__ = ('tax_definitions', 'rounding_policy', 'tax_table')
+
+    def __init__(self, tax_definitions, rounding_policy):
+        """Initialize with the tax rules.
+
+        :param tax_definitions: tax definitions in the order of application
+        :param rounding_policy: tax rounding policy
+        :type tax_definitions: Iterable
+        :type rounding_policy: BaseRoundingPolicy
+        :return:
+        """
+        tax_definitions = tuple(tax_definitions)
+        for td in tax_definitions:
+            assert isinstance(td, BaseTaxDefinition)
+        assert isinstance(rounding_policy, BaseRoundingPolicy)
+
+        _set = super(TaxProfile, self).__setattr__
+        _set('tax_definitions', tax_definitions)
+        _set('rounding_policy', rounding_policy)
+        _set('tax_table', TaxRuleTable(tax_definitions))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('TaxProfile is immutable.')
+
+    def __delattr__(self, name):
+        raise AttributeError('TaxProfile is immutable.')
+
+    def __reduce__(self):
+        return self.__class__, (self.tax_definitions, self.rounding_policy)
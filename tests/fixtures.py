@@ -3,7 +3,11 @@ import pytest
 from sales_taxes.product import Product, ProductCategory, ProductSource
 from sales_taxes.tax_definition import TaxDefinitionFactory
 from sales_taxes.cart import Cart
+from sales_taxes.main import get_input_handle, read_order
 from decimal import Decimal
+import os
+
+INPUT_FILE = os.path.join(os.path.dirname(__file__), '..', 'input.txt')
 
 @pytest.fixture(scope="module")
 def product_book(price=Decimal(10)):
@@ -31,3 +35,9 @@ def standard_cart():
     cart.add_tax_definition(TaxDefinitionFactory.
                             create_definition('ImportTaxDefinition'))
     return cart
+
+
+@pytest.fixture(scope='module')
+def order_items(filename=INPUT_FILE):
+    with get_input_handle(filename) as handle:
+        return list(read_order(handle))
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+from pytest import raises
+# The parametrize function is generated, so this doesn't work:
+#
+#     from pytest.mark import parametrize
+#
+import pytest
+
+parametrize = pytest.mark.parametrize
+
+from benchmarks.orders import generate_order_lines
+from concurrent.futures import ProcessPoolExecutor
+from sales_taxes.batch import (main, process_orders, read_orders,
+                               split_orders, process_large_orders,
+                               price_order_sharded, price_shard, partition,
+                               FailedOrder)
+from sales_taxes.main import (create_cart, price_order, receipt_printer)
+from tests.fixtures import INPUT_FILE
+from io import StringIO
+import pickle
+
+
+class TestBatch(object):
+
+    def test_split_orders(self):
+        lines = ["1 book at 12.49\n", "\n", "\n",
+                 "1 music CD at 14.99\n", "1 chocolate bar at 0.85\n"]
+
+        # blank lines separate orders
+        assert list(split_orders(lines)) == [
+            ["1 book at 12.49\n"],
+            ["1 music CD at 14.99\n", "1 chocolate bar at 0.85\n"]]
+
+        lines = ["1 book at 12.49\n", "---\n", "1 music CD at 14.99\n"]
+        assert len(list(split_orders(lines, '---'))) == 2
+
+    def test_read_orders(self, tmpdir):
+        with open(INPUT_FILE) as handle:
+            order = handle.readlines()
+        tmpdir.join('b.txt').write(''.join(order))
+        tmpdir.join('a.txt').write('1 book at 12.49\n')
+
+        # one order per file, in file name order
+        assert list(read_orders(str(tmpdir))) == [['1 book at 12.49\n'],
+                                                  order]
+
+        stream = tmpdir.join('a.txt')
+        stream.write(''.join(order + ['\n'] + order))
+        assert list(read_orders(str(stream))) == [order, order]
+
+    def test_process_orders(self):
+        orders = [["{} book at 12.49\n".format(i + 1)] for i in range(20)]
+        receipts = list(process_orders(orders, workers=2, chunksize=3))
+
+        # receipts are returned in input order
+        assert receipts == [price_order(order) for order in orders]
+        assert receipts[4].startswith("5 book: 62.45\n")
+
+    def test_failed_orders(self, tmpdir, capsys):
+        orders = [["1 book at 12.49\n"], ["bad line\n"],
+                  ["1 music CD at 14.99\n"]]
+
+        # a failing order does not stop the others
+        for receipts in (process_orders(orders, workers=2, chunksize=2),
+                         process_large_orders(orders, workers=2, shards=2)):
+            receipts = list(receipts)
+            assert receipts[0] == price_order(orders[0])
+            assert isinstance(receipts[1], FailedOrder)
+            assert 'Incorrect input format' in receipts[1].error
+            assert receipts[2] == price_order(orders[2])
+
+        source = tmpdir.join('orders.txt')
+        source.write(''.join(line for order in orders
+                             for line in order + ['\n']))
+        assert main([str(source), '--workers', '2']) == 1
+        out, err = capsys.readouterr()
+        assert out == price_order(orders[0]) + '\n' + price_order(orders[2])
+        assert 'Cannot price order 2: Incorrect input format' in err
+
+    def test_process_orders_window(self):
+        orders = [["{} book at 12.49\n".format(i + 1)] for i in range(40)]
+        read = []
+
+        def read_orders():
+            for order in orders:
+                read.append(order)
+                yield order
+
+        receipts = process_orders(read_orders(), workers=1, chunksize=2,
+                                  window=2)
+
+        # only a window of chunks is read ahead of the receipts
+        assert next(receipts) == price_order(orders[0])
+        assert len(read) <= 6
+        assert list(receipts) == [price_order(order)
+                                  for order in orders[1:]]
+
+    def test_partition(self):
+        lines = list(range(10))
+
+        assert partition(lines, 1) == [lines]
+        assert partition(lines, 3) == [[0, 1, 2], [3, 4, 5], [6, 7, 8, 9]]
+        assert partition(lines[:2], 3) == [[], [0], [1]]
+        with raises(AssertionError):
+            partition(lines, 0)
+
+    @parametrize('seed', [1, 2, 3])
+    def test_sharded_pricing(self, seed):
+        # few distinct products, so that duplicates span several shards
+        lines = list(generate_order_lines(300, seed=seed, variety=5))
+        receipt = price_order(lines)
+
+        # merging shard carts gives the same receipt as a single cart
+        for shards in range(1, 8):
+            cart = create_cart()
+            for part in partition(lines, shards):
+                cart.merge(pickle.loads(pickle.dumps(price_shard(part))))
+            output = StringIO()
+            receipt_printer(cart, output)
+            assert output.getvalue() == receipt
+
+    def test_process_large_orders(self):
+        lines = list(generate_order_lines(100, variety=5))
+        orders = [lines, lines[:7]]
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            assert price_order_sharded(lines, executor, 3) == \
+                price_order(lines)
+        assert list(process_large_orders(orders, workers=2, shards=4)) == \
+            [price_order(order) for order in orders]
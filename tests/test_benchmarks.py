@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from pytest import raises
+# The parametrize function is generated, so this doesn't work:
+#
+#     from pytest.mark import parametrize
+#
+import pytest
+
+parametrize = pytest.mark.parametrize
+
+from benchmarks.suite import (run_suite, compare, main,
+                              bench_receipt_printer)
+import json
+
+
+def results(**timings):
+    return dict(results={name: {'100': dict(seconds=seconds)}
+                         for name, seconds in timings.items()})
+
+
+class TestSuite(object):
+
+    def test_run_suite(self):
+        stages = (('receipt_printer', bench_receipt_printer),)
+        suite = run_suite([10, 20], repeat=1, stages=stages, min_time=0)
+
+        assert sorted(suite['results']['receipt_printer']) == ['10', '20']
+        timing = suite['results']['receipt_printer']['10']
+        assert timing['seconds'] > 0
+        assert timing['ns_per_line'] == timing['seconds'] / 10 * 1e9
+        # results must be serializable
+        assert json.loads(json.dumps(suite)) == suite
+
+    def test_compare(self):
+        baseline = results(parse_order=1.0, add_item=1.0, receipt_printer=0)
+
+        assert compare(results(parse_order=1.1), baseline) == []
+        assert compare(results(parse_order=1.5, add_item=0.5), baseline) == \
+            [('parse_order', '100', 1.5)]
+        assert compare(results(parse_order=1.1), baseline, 0.05) == \
+            [('parse_order', '100', 1.1)]
+        # stages missing from either result are not compared
+        assert compare(results(calculate_taxes=9.0), baseline) == []
+        assert compare(results(receipt_printer=1.0), baseline) == []
+
+    def test_main(self, tmpdir, capsys):
+        saved = str(tmpdir.join('results.json'))
+        assert main(['--sizes', '10', '--repeat', '1', '--min-time', '0',
+                     '--save', saved]) == 0
+        with open(saved) as f:
+            suite = json.load(f)
+        assert json.loads(capsys.readouterr().out) == suite
+
+        # a baseline much faster than the current results
+        timing = suite['results']['parse_order']['10']
+        timing['seconds'] /= 1000.0
+        with open(saved, 'w') as f:
+            json.dump(suite, f)
+        assert main(['--sizes', '10', '--repeat', '1', '--min-time', '0',
+                     '--baseline', saved]) == 1
+        assert 'REGRESSION parse_order at 10 lines' in capsys.readouterr().err
@@ -9,12 +9,15 @@ import pytest
 parametrize = pytest.mark.parametrize
 
 from sales_taxes import metadata
-from sales_taxes.cart import Cart
+from sales_taxes.cart import (Cart, CartPool)
 from unittest.mock import Mock
-from sales_taxes.rounding_policy import StandardRoundingPolicy
+from sales_taxes.rounding_policy import (StandardRoundingPolicy,
+                                         CeilingRoundingPolicy)
 from sales_taxes.tax_definition import BasicTaxDefinition, ImportTaxDefinition
+from sales_taxes.tax_profile import TaxProfile
 from tests.fixtures import *
 from decimal import Decimal
+import pickle
 
 
 class TestCart(object):
@@ -23,6 +26,8 @@ class TestCart(object):
         cart = Cart()
         # must have the default policy
         assert cart._rounding_policy.__class__ == StandardRoundingPolicy
+        # which is not shared between carts
+        assert Cart()._rounding_policy is not cart._rounding_policy
 
     def test_add_item(self):
         cart = standard_cart()
@@ -49,6 +54,10 @@ class TestCart(object):
         # Should calculate import and local taxes
         assert cart.get_taxes() == Decimal(1.5)
 
+        cart.add_item(product_taxable(Decimal(20), ProductSource.IMPORTED))
+        # Should use the recompiled tax rules
+        assert cart.get_taxes() == Decimal(4.5)
+
     def test_get_items(self):
         cart = Cart()
         item = product_taxable()
@@ -61,6 +70,27 @@ class TestCart(object):
         assert item in p
         assert item2 in p
 
+    def test_get_items_view(self):
+        cart = Cart()
+        item = product_taxable()
+        cart.add_item(item)
+        view = cart.get_items_view()
+
+        # view should reflect the cart without copying it
+        assert len(view) == 1
+        assert view[0] is cart._cart_items[0]
+        cart.add_item(product_taxable(Decimal(5)))
+        assert [ci.product for ci in view] == \
+            [item, product_taxable(Decimal(5))]
+
+        # view should not allow changes
+        with raises(TypeError):
+            view[0] = None
+        with raises(AttributeError):
+            view.append(None)
+        with raises(AttributeError):
+            view[0].quantity = 5
+
     def test_get_taxes(self):
         cart = standard_cart()
         product = product_taxable(Decimal(10))
@@ -91,6 +121,64 @@ class TestCart(object):
         # proper net total should be calculated
         assert cart.get_net_total() == Decimal(33)
 
+    def test_running_totals(self):
+        cart = Cart()
+        product = product_taxable(Decimal(10), ProductSource.IMPORTED)
+        product2 = product_book(Decimal(20))
+        cart.add_item(product)
+        cart.add_tax_definition(BasicTaxDefinition())
+        cart.add_item(product2, 2)
+        cart.add_item(product, 2)
+        cart.add_tax_definition(ImportTaxDefinition())
+
+        # running totals should match the per item values
+        items = cart.get_items()
+        assert cart.get_taxes() == sum(ci.tax for ci in items)
+        assert cart.get_sub_total() == sum(ci.sub_total for ci in items)
+        assert cart.get_net_total() == sum(ci.net_total for ci in items)
+        assert cart.get_taxes() == Decimal('4.5')
+
+    def test_from_profile(self):
+        profile = TaxProfile([BasicTaxDefinition(), ImportTaxDefinition()],
+                             StandardRoundingPolicy())
+        cart = Cart.from_profile(profile)
+        cart2 = Cart.from_profile(profile)
+        product = product_taxable(Decimal(10), ProductSource.IMPORTED)
+        cart.add_item(product)
+        cart2.add_item(product_book(Decimal(20)))
+
+        # carts share the compiled rules but not their items
+        assert cart._tax_table is profile.tax_table
+        assert cart.get_taxes() == Decimal('1.5')
+        assert cart2.get_taxes() == Decimal(0)
+        assert len(cart2.get_items()) == 1
+
+        # adding a definition does not affect the profile or other carts
+        cart.add_tax_definition(BasicTaxDefinition())
+        assert cart.get_taxes() == Decimal('2.5')
+        assert profile.tax_definitions == tuple(cart2._tax_definitions)
+        assert cart2._tax_table is profile.tax_table
+
+    def test_reset(self):
+        cart = standard_cart()
+        product = product_taxable(Decimal(10), ProductSource.IMPORTED)
+        cart.add_item(product)
+        items = cart._cart_items
+        view = cart.get_items_view()
+        cart.reset()
+
+        # the cart is empty but keeps its configuration and containers
+        assert len(view) == 0
+        assert cart._cart_items is items
+        assert cart._get_item_or_none(product) is None
+        assert cart.get_net_total() == Decimal(0)
+        cart.add_item(product, 2)
+        assert cart.get_taxes() == Decimal('3.0')
+
+        with raises(AssertionError):
+            with cart.transaction():
+                cart.reset()
+
     def test__get_item_or_none(self):
         cart = standard_cart()
         product = product_book()
@@ -108,6 +196,12 @@ class TestCart(object):
         assert cart_item.quantity == 5
         assert cart_item.product == product
 
+        cart.add_item(product_taxable(), 2)
+
+        # merges duplicates and keeps the insertion order
+        assert [ci.product for ci in cart._cart_items] == [product_2, product]
+        assert cart._get_item_or_none(product_2).quantity == 3
+
     def test__calculate_taxes(self):
         cart = standard_cart()
         item = product_book(Decimal(10))
@@ -159,6 +253,265 @@ class TestCart(object):
         assert cart._cart_items[0].product == p1
         assert cart.get_net_total() == 10
 
+    def test_add_items(self):
+        cart = standard_cart()
+        cart.add_items(order_items())
+
+        # whole order should be added and taxed
+        assert len(cart._cart_items) == 4
+        assert cart.get_taxes() == Decimal('6.70')
+        assert cart.get_net_total() == Decimal('74.68')
+
+        cart = standard_cart()
+        items = order_items() + [(product_taxable(), 0)]
+        with raises(AssertionError):
+            cart.add_items(items)
+
+        # nothing should be added when an item is invalid
+        assert len(cart._cart_items) == 0
+        assert cart.get_net_total() == Decimal(0)
+
+    def test_transaction(self):
+        cart = standard_cart()
+        product = product_taxable(Decimal(10))
+        product2 = product_book(Decimal(20))
+        cart.add_item(product)
+        cart._calculate_taxes = Mock(wraps=cart._calculate_taxes)
+
+        with cart.transaction():
+            cart.add_item(product, 2)
+            cart.add_item(product2)
+
+        # taxes should be calculated once for the whole batch
+        assert cart._calculate_taxes.call_count == 1
+        assert len(cart._cart_items) == 2
+        assert cart._cart_items[0].quantity == 3
+        assert cart.get_taxes() == Decimal(3)
+
+        try:
+            with cart.transaction():
+                cart.add_item(product_taxable(Decimal(5)))
+                cart.add_item(product, 4)
+                cart.add_item(product2, 0)
+        except AssertionError:
+            pass
+
+        # it should revert every change made in the transaction
+        assert len(cart._cart_items) == 2
+        assert cart._cart_items[0].quantity == 3
+        assert cart.get_taxes() == Decimal(3)
+        assert cart.get_net_total() == Decimal(53)
+
+    def test_lazy_taxes(self, monkeypatch):
+        calculate = Mock(wraps=Cart._calculate_item_tax)
+        monkeypatch.setattr(Cart, '_calculate_item_tax', calculate)
+        cart = standard_cart()
+        product = product_taxable(Decimal(10), ProductSource.IMPORTED)
+        product2 = product_book(Decimal(20))
+        cart.add_item(product)
+        cart.add_item(product2)
+        cart.add_item(product, 2)
+
+        # nothing is taxed until read, then every item is taxed once
+        assert calculate.call_count == 0
+        assert cart.get_taxes() == Decimal('4.5')
+        assert calculate.call_count == 2
+        assert cart.get_net_total() == Decimal('54.5')
+        assert calculate.call_count == 2
+
+        # only changed items are taxed again
+        items = cart.get_items()
+        cart.add_item(product2, 2)
+        assert cart.get_taxes() == Decimal('4.5')
+        assert calculate.call_count == 3
+
+        # tax rule changes reprice every item, but not copies taken before
+        cart.add_tax_definition(BasicTaxDefinition())
+        assert cart.get_taxes() == Decimal('7.5')
+        assert calculate.call_count == 5
+        assert items[0].tax == Decimal('4.5')
+
+        # reverted changes restore the tax total
+        try:
+            with cart.transaction():
+                cart.add_item(product)
+                assert cart.get_taxes() == Decimal('10.0')
+                cart.add_item(product2, 0)
+        except AssertionError:
+            pass
+        assert cart.get_taxes() == Decimal('7.5')
+        assert cart._cart_items[0].quantity == 3
+
+    def test_merge(self):
+        cart = standard_cart()
+        product = product_taxable(Decimal('0.99'), ProductSource.IMPORTED)
+        product2 = product_book(Decimal(20))
+        product3 = product_taxable(Decimal(15))
+        cart.add_item(product)
+        cart.add_item(product2)
+        other = standard_cart()
+        other.add_item(product3)
+        other.add_item(product, 2)
+        cart.merge(other)
+
+        # duplicates are combined and taxed per item
+        assert [(ci.product, ci.quantity) for ci in cart.get_items()] == \
+            [(product, 3), (product2, 1), (product3, 1)]
+        assert cart.get_items()[0].tax == Decimal('0.45')
+        assert cart.get_taxes() == Decimal('1.95')
+        assert cart.get_sub_total() == Decimal('37.97')
+        # the other cart is unchanged
+        assert len(other.get_items()) == 2
+
+        # merged items are taxed with the rules of this cart
+        cart = Cart()
+        cart.merge(other)
+        assert cart.get_taxes() == Decimal(0)
+
+        with raises(AssertionError):
+            cart.merge(cart)
+
+    def test_split(self):
+        cart = standard_cart()
+        cart.add_items(order_items())
+        parts = cart.split(3)
+
+        # consecutive items, shared rather than copied
+        assert [len(part.get_items()) for part in parts] == [1, 1, 2]
+        assert parts[2].get_items()[1] is cart.get_items()[3]
+        assert sum(part.get_taxes() for part in parts) == cart.get_taxes()
+
+        merged = parts[0]
+        merged.merge(parts[1])
+        merged.merge(parts[2])
+        assert merged.get_items() == cart.get_items()
+        assert merged.get_net_total() == cart.get_net_total()
+        assert len(cart.split(10)) == 10
+
+    def test_pickle(self, monkeypatch):
+        cart = Cart(CeilingRoundingPolicy())
+        cart.add_tax_definition(BasicTaxDefinition())
+        cart.add_tax_definition(ImportTaxDefinition())
+        cart.add_items(order_items())
+        cart.get_taxes()
+
+        calculate = Mock(wraps=Cart._calculate_item_tax)
+        monkeypatch.setattr(Cart, '_calculate_item_tax', calculate)
+        copy = pickle.loads(pickle.dumps(cart))
+
+        # taxes are restored, not calculated again
+        assert copy.get_items() == cart.get_items()
+        assert copy.get_net_total() == Decimal('74.68')
+        assert calculate.call_count == 0
+        assert isinstance(copy._rounding_policy, CeilingRoundingPolicy)
+        assert copy._get_item_or_none(cart.get_items()[0].product)
+
+        # copies can be changed independently
+        copy.add_item(cart.get_items()[0].product)
+        assert len(copy.get_items()) == len(cart.get_items())
+        assert copy.get_items()[0].quantity == 2
+        assert cart.get_items()[0].quantity == 1
+
+    def test_dump_load(self, monkeypatch):
+        cart = Cart(CeilingRoundingPolicy())
+        cart.add_tax_definition(BasicTaxDefinition())
+        cart.add_tax_definition(ImportTaxDefinition())
+        cart.add_items(order_items())
+        cart.add_item(product_taxable(Decimal('0.99'),
+                                      ProductSource.IMPORTED).replace(
+            name=u'caf\xe9 cr\xe8me'), 3)
+        data = cart.dump()
+
+        calculate = Mock(wraps=Cart._calculate_item_tax)
+        monkeypatch.setattr(Cart, '_calculate_item_tax', calculate)
+        copy = Cart.load(data)
+
+        # items, taxes and totals are restored without calculating taxes
+        assert copy.get_items() == cart.get_items()
+        assert [str(ci) for ci in copy.get_items()] == \
+            [str(ci) for ci in cart.get_items()]
+        assert str(copy.get_taxes()) == str(cart.get_taxes())
+        assert str(copy.get_net_total()) == str(cart.get_net_total())
+        assert calculate.call_count == 0
+        assert isinstance(copy._rounding_policy, CeilingRoundingPolicy)
+        assert len(data) < len(pickle.dumps(cart, pickle.HIGHEST_PROTOCOL))
+
+        # the loaded cart keeps working
+        copy.add_item(cart.get_items()[0].product)
+        assert copy.get_items()[0].quantity == 2
+        assert copy.get_taxes() == cart.get_taxes() + \
+            cart.get_items()[0].tax
+
+        # carts without items or tax definitions
+        assert str(Cart.load(Cart().dump()).get_net_total()) == '0'
+        cart = Cart()
+        cart.add_item(product_taxable(Decimal('1.50')), 2)
+        assert str(Cart.load(cart.dump()).get_taxes()) == \
+            str(cart.get_taxes())
+
+    def test_load_invalid(self):
+        data = standard_cart().dump()
+
+        with raises(ValueError):
+            Cart.load(b'')
+        with raises(ValueError):
+            Cart.load(b'XXXX' + data[4:])
+        with raises(ValueError):
+            Cart.load(data[:4] + b'\x09' + data[5:])
+        with raises(ValueError):
+            Cart.load(data[:-1])
+        with raises(ValueError):
+            Cart.load(data + b'\x00')
+
+        cart = standard_cart()
+        cart.add_item(product_taxable(), 2)
+        cart.add_item(product_book().replace(name=u'some book'), 1)
+        data = cart.dump()
+        # name indexes, prices, quantities, taxes, categories and sources
+        columns = len(data) - 2 * (4 + 3 * 8 + 2)
+
+        corrupted = [
+            # unknown category and source
+            data[:-4] + b'\xff' + data[-3:],
+            data[:-1] + b'\xff',
+            # product name that is not UTF-8
+            data.replace(b'some name', b'some nam\xff'),
+            # product name index out of the string table
+            data[:columns] + b'\xff\xff\xff\xff' + data[columns + 4:],
+            # product name index of a tax definition name
+            data[:columns] + b'\x01\x00\x00\x00' + data[columns + 4:],
+            # unknown rounding policy and tax definition
+            data.replace(b'StandardRoundingPolicy', b'StandardRoundingPolicX'),
+            data.replace(b'BasicTaxDefinition', b'BasicTaxDefinitioX'),
+            # negative price, non-positive quantities
+            data[:columns + 8] + (-1).to_bytes(8, 'little', signed=True) +
+            data[columns + 16:],
+            data[:columns + 24] + (-3).to_bytes(8, 'little', signed=True) +
+            data[columns + 32:],
+            data[:columns + 24] + bytes(8) + data[columns + 32:],
+        ]
+        for bad_data in corrupted:
+            assert bad_data != data and len(bad_data) == len(data)
+            with raises(ValueError):
+                Cart.load(bad_data)
+
+        cart = standard_cart()
+        cart.add_item(product_taxable(), 1)
+        cart.add_item(product_taxable(source=ProductSource.IMPORTED), 1)
+        data = cart.dump()
+        # same product twice
+        with raises(ValueError):
+            Cart.load(data[:-1] + data[-2:-1])
+
+    def test_dump_decimal_places(self):
+        cart = standard_cart()
+        cart.add_item(product_book(Decimal('0.125')), 1)
+
+        # amounts are dumped as whole cents
+        with raises(ValueError) as e:
+            cart.dump()
+        assert 'two decimal places' in str(e.value)
+
     def test__cart_item(self):
         cart = standard_cart()
         p = product_taxable(Decimal(10))
@@ -167,7 +520,69 @@ class TestCart(object):
         # initializes with 0 tax
         assert ci.tax == Decimal(0)
 
-        ci.tax = 1
+        ci = ci._replace(tax=1)
         # tax and total calculations
         assert ci.sub_total == Decimal(10)
         assert ci.net_total == Decimal(11)
+
+        # cart items cannot be changed
+        with raises(AttributeError):
+            ci.quantity = 2
+        assert ci == cart.CartItem(p, 1, 1)
+        assert ci != cart.CartItem(p, 2, 1)
+
+        # the tax of an entry created by a cart is calculated on access
+        ci = cart.CartItem(p, 2, pricer=cart._get_pricer())
+        assert ci._tax is None
+        assert ci.tax == Decimal(2)
+        assert ci == cart.CartItem(p, 2, Decimal(2))
+        assert hash(ci) == hash(cart.CartItem(p, 2, Decimal(2)))
+        assert ci._replace(quantity=3).tax == Decimal(3)
+        assert ci._replace(tax=Decimal(0)).tax == Decimal(0)
+
+
+class TestCartPool(object):
+
+    def test_acquire_release(self):
+        profile = TaxProfile([BasicTaxDefinition(), ImportTaxDefinition()],
+                             StandardRoundingPolicy())
+        pool = CartPool(profile, maxsize=1)
+        cart = pool.acquire()
+        cart.add_item(product_taxable(Decimal(10)))
+        pool.release(cart)
+
+        # released carts are reset and reused
+        assert len(pool) == 1
+        assert pool.acquire() is cart
+        assert len(cart.get_items()) == 0
+        assert len(pool) == 0
+
+        # at most maxsize carts are kept
+        cart2 = pool.acquire()
+        assert cart2 is not cart
+        pool.release(cart)
+        pool.release(cart2)
+        assert len(pool) == 1
+
+    def test_release_changed_cart(self):
+        profile = TaxProfile([BasicTaxDefinition()], StandardRoundingPolicy())
+        pool = CartPool(profile)
+        cart = pool.acquire()
+        cart.add_tax_definition(ImportTaxDefinition())
+        pool.release(cart)
+
+        # carts no longer matching the profile are dropped
+        assert len(pool) == 0
+
+    def test_cart(self):
+        profile = TaxProfile([BasicTaxDefinition()], StandardRoundingPolicy())
+        pool = CartPool(profile)
+
+        with raises(ValueError):
+            with pool.cart() as cart:
+                cart.add_item(product_taxable(Decimal(10)))
+                raise ValueError()
+        assert len(pool) == 1
+        with pool.cart() as cart2:
+            assert cart2 is cart
+            assert cart2.get_taxes() == Decimal(0)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from pytest import raises
+# The parametrize function is generated, so this doesn't work:
+#
+#     from pytest.mark import parametrize
+#
+import pytest
+
+parametrize = pytest.mark.parametrize
+
+from sales_taxes.categorizer import KeywordCategorizer
+from sales_taxes.product import ProductCategory
+import random
+
+
+def brute_force_categorize(keywords, name):
+    for category, keyword in keywords:
+        if keyword in name:
+            return category
+    return ProductCategory.OTHER
+
+
+class TestKeywordCategorizer(object):
+
+    def test_categorize(self):
+        categorizer = KeywordCategorizer()
+
+        assert categorizer.categorize('book') == ProductCategory.BOOKS
+        assert categorizer.categorize('box of imported chocolates') == \
+            ProductCategory.FOODS
+        assert categorizer.categorize('packet of headache pills') == \
+            ProductCategory.MEDICAL
+        assert categorizer.categorize('bottle of perfume') == \
+            ProductCategory.OTHER
+        assert categorizer.categorize('') == ProductCategory.OTHER
+
+        # first keyword of the table wins
+        assert categorizer.categorize('chocolate book') == \
+            ProductCategory.BOOKS
+        assert categorizer.categorize('headache pill chocolate') == \
+            ProductCategory.FOODS
+
+    def test_overlapping_keywords(self):
+        rnd = random.Random(42)
+        categories = (ProductCategory.BOOKS, ProductCategory.FOODS,
+                      ProductCategory.MEDICAL)
+        keywords = [(rnd.choice(categories),
+                     ''.join(rnd.choice('ab') for _ in
+                             range(rnd.randint(1, 5))))
+                    for _ in range(20)]
+        categorizer = KeywordCategorizer(keywords)
+
+        # same result as checking every keyword in order
+        for _ in range(500):
+            name = ''.join(rnd.choice('abc')
+                           for _ in range(rnd.randint(0, 12)))
+            assert categorizer.categorize(name) == \
+                brute_force_categorize(keywords, name)
+
+    def test_from_file(self, tmpdir):
+        table = tmpdir.join('keywords.txt')
+        table.write("# category keyword\n"
+                    "\n"
+                    "MEDICAL headache pill\n"
+                    "foods chocolate\n")
+        categorizer = KeywordCategorizer.from_file(str(table))
+
+        assert categorizer.categorize('headache pill chocolate') == \
+            ProductCategory.MEDICAL
+        assert categorizer.categorize('book') == ProductCategory.OTHER
+
+        table.write("TOYS teddy bear\n")
+        with raises(ValueError):
+            KeywordCategorizer.from_file(str(table))
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from pytest import raises
+# The parametrize function is generated, so this doesn't work:
+#
+#     from pytest.mark import parametrize
+#
+import pytest
+
+parametrize = pytest.mark.parametrize
+
+from tests.fixtures import *
+from sales_taxes.columnar import ColumnarTaxEngine, from_cents, to_cents
+from sales_taxes.tax_definition import BasicTaxDefinition, ImportTaxDefinition
+from decimal import Decimal
+import random
+
+
+def random_items(count, seed=42):
+    rnd = random.Random(seed)
+    categories = (ProductCategory.BOOKS, ProductCategory.FOODS,
+                  ProductCategory.MEDICAL, ProductCategory.OTHER)
+    sources = (ProductSource.LOCAL, ProductSource.IMPORTED)
+    return [(Product("product {}".format(i),
+                     from_cents(rnd.randint(1, 500000)),
+                     rnd.choice(sources),
+                     rnd.choice(categories)),
+             rnd.randint(1, 50))
+            for i in range(count)]
+
+
+class TestColumnarTaxEngine(object):
+
+    def assert_matches_cart(self, use_numpy):
+        items = random_items(2000)
+        cart = standard_cart()
+        cart.add_items(items)
+        engine = ColumnarTaxEngine([BasicTaxDefinition(),
+                                    ImportTaxDefinition()],
+                                   use_numpy=use_numpy)
+        engine.extend(items)
+
+        # per line taxes and totals should be identical to the cart
+        taxes = engine.calculate()
+        assert [from_cents(t) for t in taxes] == \
+            [ci.tax for ci in cart.get_items()]
+        assert str(engine.get_taxes()) == str(cart.get_taxes())
+        assert str(engine.get_sub_total()) == str(cart.get_sub_total())
+        assert str(engine.get_net_total()) == str(cart.get_net_total())
+
+    def test_calculate(self):
+        self.assert_matches_cart(use_numpy=False)
+
+    def test_calculate_numpy(self):
+        pytest.importorskip('numpy')
+        self.assert_matches_cart(use_numpy=True)
+
+    def test_order(self):
+        engine = ColumnarTaxEngine([BasicTaxDefinition(),
+                                    ImportTaxDefinition()])
+        engine.extend(order_items())
+
+        assert list(engine.calculate()) == [420, 190, 0, 60]
+        assert engine.get_taxes() == Decimal('6.70')
+        assert engine.get_net_total() == Decimal('74.68')
+
+    def test_cents(self):
+        assert to_cents(Decimal('27.99')) == 2799
+        assert str(from_cents(150)) == '1.50'
+
+        # sub cent values cannot be represented
+        with raises(AssertionError):
+            to_cents(Decimal('0.001'))
@@ -8,7 +8,9 @@ import pytest
 
 parametrize = pytest.mark.parametrize
 
-from sales_taxes.main import parse_order
+from sales_taxes.main import parse_order, receipt_printer, stream_receipt
+from tests.fixtures import standard_cart, order_items, INPUT_FILE
+from io import StringIO
 from sales_taxes.product import ProductCategory, ProductSource
 from decimal import Decimal, ROUND_DOWN
 
@@ -39,3 +41,33 @@ class TestMain(object):
         ))
         line = "1 perfume bottle at 1"
         assert parse_order(line) == result
+
+    def test_receipt_printer(self):
+        cart = standard_cart()
+        cart.add_items(order_items())
+        output = StringIO()
+        receipt_printer(cart, output)
+
+        # prints every item followed by the totals
+        assert output.getvalue() == (
+            "1 imported bottle of perfume: 32.19\n"
+            "1 bottle of perfume: 20.89\n"
+            "1 packet of headache pills: 9.75\n"
+            "1 imported box of chocolates: 11.85\n"
+            "Sales Taxes: 6.70\n"
+            "Total: 74.68\n")
+
+    def test_stream_receipt(self):
+        cart = standard_cart()
+        cart.add_items(order_items())
+        expected = StringIO()
+        receipt_printer(cart, expected)
+
+        cart = standard_cart()
+        output = StringIO()
+        with open(INPUT_FILE) as lines:
+            stream_receipt(cart, lines, output)
+
+        # prints the same receipt without adding items to the cart
+        assert output.getvalue() == expected.getvalue()
+        assert len(cart.get_items()) == 0
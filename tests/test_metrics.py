@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+from pytest import raises
+# The parametrize function is generated, so this doesn't work:
+#
+#     from pytest.mark import parametrize
+#
+import pytest
+
+parametrize = pytest.mark.parametrize
+
+from tests.fixtures import *
+from io import StringIO
+from sales_taxes import parser
+from sales_taxes.cart import Cart
+from sales_taxes.main import (main, price_order, read_order)
+from sales_taxes.metrics import (Metrics, Histogram, BUCKETS)
+from sales_taxes.rounding_policy import StandardRoundingPolicy
+from sales_taxes.tax_definition import (BasicTaxDefinition, TaxRuleTable)
+import json
+import time
+
+LINES = ['1 imported bottle of perfume at 27.99\n',
+         '1 box of chocolates at 10.00\n',
+         '2 book at 12.49\n']
+
+
+class TestMetrics(object):
+
+    def test_enable(self):
+        metrics = Metrics()
+        originals = (parser.parse_order, Cart._commit,
+                     parser.MappedOrderReader.parse_products,
+                     TaxRuleTable.get_rates, StandardRoundingPolicy.apply)
+        calculate_item_tax = Cart.__dict__['_calculate_item_tax']
+
+        metrics.enable()
+        assert metrics.enabled
+        assert Cart._commit is not originals[1]
+        # static methods stay static
+        assert isinstance(Cart.__dict__['_calculate_item_tax'],
+                          staticmethod)
+        assert Cart.__dict__['_calculate_item_tax'] is not calculate_item_tax
+        metrics.disable()
+
+        # the original functions are restored
+        assert not metrics.enabled
+        assert (parser.parse_order, Cart._commit,
+                parser.MappedOrderReader.parse_products,
+                TaxRuleTable.get_rates, StandardRoundingPolicy.apply) == \
+            originals
+        assert Cart.__dict__['_calculate_item_tax'] is calculate_item_tax
+
+    def test_profiling(self):
+        metrics = Metrics()
+        receipt = price_order(LINES)
+        with metrics.profiling():
+            assert price_order(LINES) == receipt
+        assert not metrics.enabled
+
+        stages = metrics.snapshot()['stages']
+        assert stages['parse_order']['count'] == 3
+        assert stages['fuzzy_categorize']['count'] == 3
+        assert stages['add_item']['count'] == 3
+        assert stages['commit']['count'] == 1
+        # rebinding at commit, then the tax of each item when printed
+        assert stages['calculate_taxes']['count'] == 4
+        # one call per rendered receipt
+        assert stages['receipt_printer']['count'] == 1
+        # one observation per item and definition
+        definitions = metrics.snapshot()['tax_definitions']
+        assert definitions['BasicTaxDefinition']['count'] == 3
+        assert definitions['ImportTaxDefinition']['count'] == 3
+
+        # no observations while disabled
+        price_order(LINES)
+        assert metrics.stages['parse_order'].count == 3
+        assert metrics.tax_definitions['BasicTaxDefinition'].count == 3
+
+        # roundings without a rates lookup are not attributed
+        with metrics.profiling():
+            StandardRoundingPolicy().apply(product_taxable().price)
+        assert metrics.tax_definitions['BasicTaxDefinition'].count == 3
+
+        metrics.reset()
+        assert metrics.snapshot() == dict(stages={}, tax_definitions={})
+
+    def test_nested_stages(self):
+        class Pipeline(object):
+            def outer(self):
+                self.inner()
+
+            def inner(self):
+                time.sleep(0.05)
+
+        metrics = Metrics([(Pipeline, 'outer', 'outer'),
+                           (Pipeline, 'inner', 'inner')])
+        with metrics.profiling():
+            Pipeline().outer()
+
+        # the time of the inner stage is not counted in the outer stage
+        assert metrics.stages['inner'].sum >= 0.05
+        assert metrics.stages['outer'].sum < 0.05
+
+    def test_mapped_orders(self, tmpdir):
+        filename = str(tmpdir.join('order.txt'))
+        with open(filename, 'w') as f:
+            f.write(''.join(LINES))
+        metrics = Metrics()
+        reader = parser.MappedOrderReader(filename)
+        try:
+            with metrics.profiling():
+                cart = Cart()
+                cart.add_items(read_order(reader))
+        finally:
+            reader.close()
+
+        # mapped lines are timed as they are parsed, one per line
+        assert metrics.stages['parse_order'].count == 3
+        assert metrics.stages['fuzzy_categorize'].count == 3
+        assert len(cart.get_items()) == 3
+
+    def test_partial_stages(self):
+        class Writer(object):
+            def write_items(self):
+                self.tax()
+
+            def write_totals(self):
+                time.sleep(0.02)
+
+            def tax(self):
+                time.sleep(0.05)
+
+        metrics = Metrics([(Writer, 'write_totals', 'receipt'),
+                           (Writer, 'tax', 'tax')],
+                          [(Writer, 'write_items', 'receipt')])
+        with metrics.profiling():
+            writer = Writer()
+            writer.write_items()
+            writer.write_items()
+            writer.write_totals()
+
+        # the items are timed with the totals, without the nested taxes
+        assert metrics.stages['receipt'].count == 1
+        assert 0.02 <= metrics.stages['receipt'].sum < 0.05
+        assert metrics.stages['tax'].count == 2
+
+    def test_histogram(self):
+        h = Histogram()
+        h.observe(5e-6)
+        h.observe(1e-5)
+        h.observe(100.0)
+
+        assert h.count == 3
+        assert h.buckets == [0, 2, 0, 0, 0, 0, 0, 1]
+        assert len(h.buckets) == len(BUCKETS)
+        assert h.to_dict()['buckets']['+Inf'] == 1
+
+    def test_export(self):
+        metrics = Metrics()
+        metrics.observe('parse_order', 5e-6)
+        metrics.observe('parse_order', 2.0)
+        metrics.observe_tax_definition(BasicTaxDefinition(), 5e-6)
+
+        output = StringIO()
+        metrics.export(output, 'json')
+        assert json.loads(output.getvalue()) == metrics.snapshot()
+
+        output = StringIO()
+        metrics.export(output, 'prometheus')
+        lines = output.getvalue().splitlines()
+        assert '# TYPE sales_taxes_stage_seconds histogram' in lines
+        # buckets are cumulative
+        assert 'sales_taxes_stage_seconds_bucket{stage="parse_order",' \
+               'le="1e-05"} 1' in lines
+        assert 'sales_taxes_stage_seconds_bucket{stage="parse_order",' \
+               'le="+Inf"} 2' in lines
+        assert 'sales_taxes_stage_seconds_count{stage="parse_order"} 2' \
+            in lines
+        assert 'sales_taxes_tax_definition_seconds_count' \
+               '{definition="BasicTaxDefinition"} 1' in lines
+
+        with raises(AssertionError):
+            metrics.export(output, 'xml')
+
+    def test_main(self, tmpdir, capsys):
+        filename = str(tmpdir.join('metrics.prom'))
+        assert main([INPUT_FILE, '--profile', '--metrics', filename,
+                     '--metrics-format', 'prometheus']) == 0
+
+        err = capsys.readouterr().err
+        assert err.startswith('Stage')
+        assert 'calculate_taxes' in err
+        with open(filename) as f:
+            assert 'sales_taxes_stage_seconds_count{stage="commit"} 1' in \
+                f.read().splitlines()
+
+        assert main([INPUT_FILE, '--mmap', '--profile']) == 0
+        assert 'parse_order' in capsys.readouterr().err
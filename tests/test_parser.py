@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+from pytest import raises
+# The parametrize function is generated, so this doesn't work:
+#
+#     from pytest.mark import parametrize
+#
+import pytest
+
+parametrize = pytest.mark.parametrize
+
+from sales_taxes.parser import (INPUT_REGEX, parse_order, parse_orders,
+                                fuzzy_categorize, ProductCache,
+                                MappedOrderReader)
+from sales_taxes.product import ProductSource, Product
+from sales_taxes.helpers import currencyfy
+from decimal import Decimal
+import re
+
+
+def reference_parse_order(line):
+    # Original two regex pass implementation
+    m = re.match(INPUT_REGEX, line)
+    name = re.sub(r"\s*imported\s*", ' ', m.group('name')).strip()
+    return int(m.group('quantity')), dict(
+        name=name,
+        product_source=ProductSource.IMPORTED if m.group('imported')
+        else ProductSource.LOCAL,
+        price=currencyfy(Decimal(m.group('price'))),
+        product_category=fuzzy_categorize(m.group('name')))
+
+
+class TestParser(object):
+
+    def test_parse_order(self):
+        lines = [
+            "1 imported bottle of perfume at 27.99",
+            "1 box of imported chocolates at 11.25\n",
+            "2 book at 12.49",
+            "3 imported imported book at .5",
+            "1 bottle imported at 1.999",
+            "1 importe thing at 2",
+            "1 imported at 2",
+            "1 x  at  at 3",
+        ]
+
+        # same results as the original implementation
+        for line in lines:
+            assert parse_order(line) == reference_parse_order(line)
+
+    def test_parse_order_rejects(self):
+        for line in ("", "book at 12.49", "1 book at", "1 book at 1.2.3",
+                     "1 at 12.49", "-1 book at 12.49"):
+            with raises(Exception) as e:
+                parse_order(line)
+            assert "Cannot parse" in str(e.value)
+
+    def test_parse_orders(self):
+        lines = ["1 book at 12.49\n", "1 imported box of chocolates at 10.00"]
+
+        assert list(parse_orders(lines)) == [parse_order(l) for l in lines]
+        assert list(parse_orders([])) == []
+
+    def test_product_cache(self):
+        cache = ProductCache(maxsize=2)
+        quantity, product = cache.parse_order("2 imported book at 12.49")
+
+        # same product as parse_order
+        assert quantity == 2
+        assert product == Product(**parse_order("2 imported book at 12.49")[1])
+
+        # same spec shares the instance, other quantities included
+        assert cache.parse_order("1 imported book at 12.49\n")[1] is product
+        assert cache.parse_order("1 book at 12.49")[1] is not product
+        assert cache.get_stats() == dict(hits=1, misses=2, evictions=0,
+                                         size=2)
+
+        # least recently used product is evicted
+        cache.parse_order("1 imported book at 12.49")
+        cache.parse_order("1 music CD at 14.99")
+        assert cache.parse_order("1 imported book at 12.49")[1] is product
+        assert cache.parse_order("1 book at 12.49")[1] is not product
+        assert cache.get_stats() == dict(hits=3, misses=4, evictions=2,
+                                         size=2)
+
+        with raises(Exception):
+            cache.parse_order("book at 12.49")
+
+    def test_product_cache_parse_orders(self):
+        cache = ProductCache()
+        lines = ["1 book at 12.49", "2 book at 12.49", "1 book at 12.50"]
+        products = [p for _, p in cache.parse_orders(lines)]
+
+        assert [q for q, _ in cache.parse_orders(lines)] == [1, 2, 1]
+        assert products[0] is products[1]
+        assert products[0] != products[2]
+
+    def test_mapped_order_reader(self, tmpdir):
+        lines = [
+            "1 imported bottle of perfume at 27.99",
+            "1 box of imported chocolates at 11.25",
+            "2 book at 12.49",
+            "3 imported imported book at .5",
+            "1 bottle imported at 1.999",
+            "1 crème brûlée at 007",
+            "1 importe thing at 2",
+        ]
+        orders = tmpdir.join('orders.txt')
+        orders.write_binary(("\n".join(lines[:3]) + "\r\n" +
+                             "\n".join(lines[3:])).encode('utf-8'))
+        reader = MappedOrderReader(str(orders))
+        try:
+            # same results as parsing the decoded lines
+            assert list(reader.parse_orders()) == \
+                [parse_order(line) for line in lines]
+            assert list(reader) == [line + "\n" for line in lines]
+
+            cache = ProductCache()
+            products = list(reader.parse_products(cache))
+            assert products == \
+                [(q, Product(**d)) for q, d in map(parse_order, lines)]
+            assert cache.get_stats()['misses'] == len(lines)
+        finally:
+            reader.close()
+
+        orders.write_binary(b"1 book at 12.49\n\n1 book at 12.49\n")
+        reader = MappedOrderReader(str(orders))
+        with raises(Exception) as e:
+            list(reader.parse_orders())
+        assert "Cannot parse" in str(e.value)
+        reader.close()
+
+        orders.write_binary(b"")
+        reader = MappedOrderReader(str(orders))
+        assert list(reader.parse_orders()) == []
+        reader.close()
@@ -9,6 +9,8 @@ import pytest
 parametrize = pytest.mark.parametrize
 
 from tests.fixtures import *
+from copy import deepcopy
+import pickle
 
 class TestProduct(object):
 
@@ -18,20 +20,46 @@ class TestProduct(object):
 
         assert p1 == p2
 
-        p1.name = "other name"
+        p1 = p2.replace(name="other name")
         assert p1 != p2
 
-        p1 = product_taxable()
-        p1.price = Decimal(88)
+        p1 = p2.replace(price=Decimal(88))
         assert p1 != p2
 
-        p1 = product_taxable()
-        p1.product_source = ProductSource.IMPORTED
+        p1 = p2.replace(product_source=ProductSource.IMPORTED)
         assert p1 != p2
 
-        p1 = product_taxable()
-        p1.product_category = ProductCategory.BOOKS
+        p1 = p2.replace(product_category=ProductCategory.BOOKS)
         assert p1 != p2
 
-        p1.product_category = p2.product_category
+        p1 = p1.replace(product_category=p2.product_category)
         assert p1 == p2
+
+    def test_immutable(self):
+        p = product_taxable()
+
+        with raises(AttributeError):
+            p.name = "other name"
+        with raises(AttributeError):
+            p.price = Decimal(88)
+        with raises(AttributeError):
+            del p.product_source
+        with raises(AttributeError):
+            p.other = 1
+
+        # copies keep the product intact
+        assert deepcopy(p) == p
+        assert pickle.loads(pickle.dumps(p)) == p
+
+    def test__hash(self):
+        p1 = product_taxable()
+        p2 = product_taxable()
+
+        # equal products should share the identity key and hash
+        assert p1.key == p2.key
+        assert hash(p1) == hash(p2)
+        assert len({p1, p2}) == 1
+
+        p1 = product_taxable(Decimal(88))
+        assert p1.key != p2.key
+        assert len({p1, p2}) == 2
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+from pytest import raises
+# The parametrize function is generated, so this doesn't work:
+#
+#     from pytest.mark import parametrize
+#
+import pytest
+
+parametrize = pytest.mark.parametrize
+
+from io import StringIO
+from sales_taxes.main import price_order
+from sales_taxes.quote_cache import (QuoteCache, price_quote)
+from sales_taxes.tax_profile import TaxProfileFactory
+from decimal import Decimal
+from unittest.mock import patch
+import pickle
+
+LINES = ['1 imported bottle of perfume at 27.99\n',
+         '1 packet of headache pills at 9.75\n',
+         '1 imported box of chocolates at 11.25\n']
+
+
+class Clock(object):
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+class TestQuote(object):
+
+    def test_price_quote(self):
+        quote = price_quote(LINES)
+
+        assert quote.taxes == Decimal('4.80')
+        assert quote.total == Decimal('53.79')
+        assert [ci.tax for ci in quote.items] == \
+            [Decimal('4.20'), Decimal(0), Decimal('0.60')]
+        with raises(AttributeError):
+            quote.total = Decimal(0)
+
+        # renders the same receipt as pricing the order
+        output = StringIO()
+        quote.render(output)
+        assert output.getvalue() == price_order(LINES)
+        copy = pickle.loads(pickle.dumps(quote))
+        assert copy.items == quote.items and copy.total == quote.total
+
+
+class TestQuoteCache(object):
+
+    def test_fingerprint(self):
+        cache = QuoteCache()
+        key = cache.fingerprint(LINES)
+
+        # the exact text, order and profile matter
+        assert cache.fingerprint(list(LINES)) == key
+        assert cache.fingerprint(['1 imported  bottle of perfume at 27.99\n']
+                                 + LINES[1:]) != key
+        assert cache.fingerprint(['\n'] + LINES) != key
+        assert cache.fingerprint(['a', 'b']) != cache.fingerprint(['ab'])
+        assert cache.fingerprint(LINES[::-1]) != key
+        assert cache.fingerprint(LINES, 'CeilingTaxProfile') != key
+
+    def test_get_quote(self):
+        cache = QuoteCache(maxsize=2)
+        with patch('sales_taxes.quote_cache.price_quote',
+                   wraps=price_quote) as pricing:
+            quote = cache.get_quote(LINES)
+            assert cache.get_quote(list(LINES)) is quote
+            assert pricing.call_count == 1
+
+            # least recently used quotes are evicted
+            cache.get_quote(LINES[:1])
+            cache.get_quote(LINES)
+            cache.get_quote(LINES[:2])
+            assert len(cache) == 2
+            assert cache.get_quote(LINES) is quote
+            cache.get_quote(LINES[:1])
+            assert pricing.call_count == 4
+
+        assert cache.get_stats() == dict(hits=3, misses=4, evictions=2,
+                                         expirations=0, size=2)
+
+    def test_get_quote_exact_text(self):
+        cache = QuoteCache()
+        order = ['1 box of chocolates at 10.00\n']
+        cache.get_quote(order)
+
+        # lines the parser rejects are never served from the cache
+        for line in (' ' + order[0], order[0].rstrip('\n') + ' '):
+            with raises(Exception):
+                cache.get_quote([line])
+
+        # names keep their inner whitespace
+        output = StringIO()
+        cache.get_quote(['1 box   of chocolates at 10.00\n']).render(output)
+        assert output.getvalue() == \
+            price_order(['1 box   of chocolates at 10.00\n'])
+        assert len(cache) == 2
+
+    def test_ttl(self):
+        clock = Clock()
+        cache = QuoteCache(ttl=10, clock=clock)
+        quote = cache.get_quote(LINES)
+
+        clock.time = 9.9
+        assert cache.get_quote(LINES) is quote
+        clock.time = 10
+        assert cache.get_quote(LINES) is not quote
+        assert cache.expirations == 1
+
+        with raises(AssertionError):
+            QuoteCache(ttl=0)
+
+    def test_invalidate(self):
+        cache = QuoteCache()
+        quote = cache.get_quote(LINES)
+        cache.get_quote(LINES, 'CeilingTaxProfile')
+
+        cache.invalidate('StandardTaxProfile')
+        assert len(cache) == 1
+        assert cache.get_quote(LINES) is not quote
+        cache.invalidate()
+        assert len(cache) == 0
+
+    def test_profile_change(self):
+        TaxProfileFactory.register_profile('QuoteTaxProfile',
+                                           ['BasicTaxDefinition'],
+                                           'StandardRoundingPolicy')
+        try:
+            cache = QuoteCache()
+            assert cache.get_quote(LINES, 'QuoteTaxProfile').taxes == \
+                Decimal('2.80')
+
+            # quotes of the previous tax rules are not returned
+            TaxProfileFactory.register_profile('QuoteTaxProfile',
+                                               ['BasicTaxDefinition',
+                                                'ImportTaxDefinition'],
+                                               'StandardRoundingPolicy')
+            assert cache.get_quote(LINES, 'QuoteTaxProfile').taxes == \
+                Decimal('4.80')
+        finally:
+            TaxProfileFactory.PROFILES.pop('QuoteTaxProfile')
+            TaxProfileFactory._profiles.pop('QuoteTaxProfile', None)
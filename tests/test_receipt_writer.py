@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from pytest import raises
+# The parametrize function is generated, so this doesn't work:
+#
+#     from pytest.mark import parametrize
+#
+import pytest
+
+parametrize = pytest.mark.parametrize
+
+from tests.fixtures import *
+from sales_taxes.receipt_writer import ReceiptWriter
+from io import StringIO
+from unittest.mock import Mock
+import csv
+import json
+
+
+def filled_cart(count=25):
+    cart = standard_cart()
+    cart.add_items((product_taxable(Decimal(i + 1),
+                                    ProductSource.IMPORTED if i % 2
+                                    else ProductSource.LOCAL), i % 3 + 1)
+                   for i in range(count))
+    return cart
+
+
+class TestReceiptWriter(object):
+
+    def test_text(self):
+        cart = filled_cart()
+        expected = ''.join("{}\n".format(ci) for ci in cart.get_items())
+        expected += "Sales Taxes: {}\n".format(cart.get_taxes())
+        expected += "Total: {}\n".format(cart.get_net_total())
+
+        # identical to printing each item on its own
+        for flush_size in (1, 7, 1000):
+            output = StringIO()
+            ReceiptWriter(output, flush_size=flush_size).write_cart(cart)
+            assert output.getvalue() == expected
+
+    def test_flush_size(self):
+        output = Mock()
+        ReceiptWriter(output, flush_size=10).write_cart(filled_cart())
+
+        # 25 items in chunks of 10, the last chunk with the totals
+        assert output.write.call_count == 3
+
+    def test_csv(self):
+        cart = filled_cart()
+        output = StringIO()
+        ReceiptWriter(output, 'csv', flush_size=4).write_cart(cart)
+        rows = list(csv.reader(StringIO(output.getvalue())))
+
+        assert rows[0] == ['quantity', 'product', 'tax', 'net_total']
+        assert rows[1] == ['1', 'some name', '0.10', '1.10']
+        assert len(rows) == 27
+        assert rows[-1] == ['', 'Total', str(cart.get_taxes()),
+                            str(cart.get_net_total())]
+
+    def test_jsonl(self):
+        cart = standard_cart()
+        cart.add_items(order_items())
+        output = StringIO()
+        ReceiptWriter(output, 'jsonl').write_cart(cart)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+
+        assert records[0] == dict(quantity=1,
+                                  product='imported bottle of perfume',
+                                  tax='4.20', net_total='32.19')
+        assert records[-1] == dict(sales_taxes='6.70', total='74.68')
+
+        with raises(AssertionError):
+            ReceiptWriter(output, 'xml')
@@ -11,6 +11,8 @@ parametrize = pytest.mark.parametrize
 from tests.fixtures import *
 from sales_taxes.rounding_policy import RoundingPolicyFactory, StandardRoundingPolicy
 from decimal import Decimal, ROUND_DOWN
+import random
+
 class TestRoundingPolicy(object):
 
     def test_factory(self):
@@ -33,3 +35,18 @@ class TestRoundingPolicy(object):
             k = _k.quantize(Decimal('.01'), rounding=ROUND_DOWN)
             v = _v.quantize(Decimal('.01'), rounding=ROUND_DOWN)
             assert srp.apply(k) == v
+
+    def test_ceiling_rounding_policy(self):
+        crp = RoundingPolicyFactory.create_policy('CeilingRoundingPolicy')
+        srp = StandardRoundingPolicy()
+        rnd = random.Random(42)
+
+        values = [Decimal(0), Decimal('0.01'), Decimal('-0.01'),
+                  Decimal('-1.99'), Decimal('1E+1'), Decimal('0.001')] + \
+            [Decimal(rnd.randint(0, 10 ** 6)).scaleb(-2) *
+             rnd.choice((Decimal('0.10'), Decimal('0.05'))) *
+             rnd.randint(1, 20) for _ in range(1000)]
+
+        # same results as the standard policy, including the exponent
+        for value in values:
+            assert str(crp.apply(value)) == str(srp.apply(value))
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+from pytest import raises
+# The parametrize function is generated, so this doesn't work:
+#
+#     from pytest.mark import parametrize
+#
+import pytest
+
+parametrize = pytest.mark.parametrize
+
+from sales_taxes.server import PricingServer
+from sales_taxes.quote_cache import QuoteCache
+from sales_taxes.main import price_order
+from tests.fixtures import INPUT_FILE
+from unittest.mock import Mock
+import asyncio
+import json
+
+
+async def request(port, method, path, body=b''):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write("{} {} HTTP/1.1\r\nHost: localhost\r\n"
+                 "Content-Length: {}\r\n\r\n".format(
+                     method, path, len(body)).encode('ascii') + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split(b' ')[1]), body.decode('utf-8')
+
+
+def serve(service, *requests):
+    async def run():
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await asyncio.gather(*[request(port, *r)
+                                          for r in requests])
+    return asyncio.run(run())
+
+
+class TestPricingServer(object):
+
+    def test_price(self):
+        with open(INPUT_FILE, 'rb') as handle:
+            order = handle.read()
+        large_order = b"1 book at 12.49\n" * 50
+
+        service = PricingServer(batch_size=10)
+        responses = serve(service,
+                          ('POST', '/price', order),
+                          ('POST', '/price', large_order),
+                          ('POST', '/price', b"1 book at\n"),
+                          ('GET', '/price'),
+                          ('GET', '/other'))
+
+        # concurrent requests are priced independently
+        assert responses[0] == (200, price_order(order.decode().splitlines()))
+        assert responses[1] == (200, "50 book: 624.50\n"
+                                     "Sales Taxes: 0.00\n"
+                                     "Total: 624.50\n")
+        assert responses[2][0] == 400
+        assert responses[3][0] == 405
+        assert responses[4][0] == 404
+
+    def test_stats(self):
+        service = PricingServer()
+        serve(service, *[('POST', '/price', b"1 book at 12.49\n")] * 5)
+        status, body = serve(service, ('GET', '/stats'))[0]
+        stats = json.loads(body)
+
+        assert status == 200
+        assert stats['requests'] == 5
+        assert 0 < stats['p50_ms'] <= stats['p99_ms']
+        assert service.get_stats()['requests'] == 6
+
+    def test_connection_reset(self):
+        class Reader(object):
+            async def readline(self):
+                raise ConnectionResetError()
+
+        service = PricingServer()
+        writer = Mock()
+        with raises(ConnectionResetError):
+            asyncio.run(service.handle(Reader(), writer))
+
+        # the connection is closed and the request recorded
+        assert writer.close.call_count == 1
+        assert service.get_stats()['requests'] == 1
+        assert service.get_stats()['p50_ms'] >= 0
+
+    def test_quote_cache(self):
+        with open(INPUT_FILE, 'rb') as handle:
+            order = handle.read()
+        large_order = b"1 book at 12.49\n" * 50
+
+        service = PricingServer(batch_size=10, quote_cache=QuoteCache())
+        responses = serve(service,
+                          ('POST', '/price', order),
+                          ('POST', '/price', large_order),
+                          ('POST', '/price', b"1 book at\n"))
+        responses += serve(service,
+                           ('POST', '/price', order),
+                           ('POST', '/price', large_order),
+                           ('GET', '/stats'),
+                           ('POST', '/price', b" " + order))
+
+        # cached receipts are the same
+        assert responses[0] == responses[3] == \
+            (200, price_order(order.decode().splitlines()))
+        assert responses[1] == responses[4]
+        assert responses[2][0] == 400
+        stats = json.loads(responses[5][1])
+        assert stats['quote_cache']['hits'] == 2
+        assert stats['quote_cache']['size'] == 2
+        # rejected orders are not served from the cache
+        assert responses[6][0] == 400
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from pytest import raises
+# The parametrize function is generated, so this doesn't work:
+#
+#     from pytest.mark import parametrize
+#
+import pytest
+
+parametrize = pytest.mark.parametrize
+
+from tests.fixtures import *
+from sales_taxes.tax_definition import (BaseTaxDefinition,
+                                        BasicTaxDefinition,
+                                        ImportTaxDefinition, TaxRuleTable)
+from decimal import Decimal
+
+
+class TestTaxDefinition(object):
+
+    def test_apply(self):
+        btd = BasicTaxDefinition()
+        itd = ImportTaxDefinition()
+
+        assert btd.apply(product_taxable(Decimal(10))) == Decimal(1)
+        assert btd.apply(product_book(Decimal(10))) == Decimal(0)
+        assert itd.apply(product_taxable(Decimal(10))) == Decimal(0)
+        assert itd.apply(product_taxable(Decimal(10),
+                                         ProductSource.IMPORTED)) == \
+            Decimal('0.5')
+
+        with raises(NotImplementedError):
+            BaseTaxDefinition().apply(product_taxable())
+
+    def test_tax_rule_table(self):
+        table = TaxRuleTable([BasicTaxDefinition(), ImportTaxDefinition()])
+
+        # one rate per definition, in order of application
+        assert table.get_rates(ProductCategory.OTHER,
+                               ProductSource.LOCAL) == \
+            (Decimal('0.10'), Decimal(0))
+        assert table.get_rates(ProductCategory.BOOKS,
+                               ProductSource.IMPORTED) == \
+            (Decimal(0), Decimal('0.05'))
+        assert table.get_rates(ProductCategory.FOODS,
+                               ProductSource.LOCAL) == \
+            (Decimal(0), Decimal(0))
+
+        assert TaxRuleTable([]).get_rates(ProductCategory.OTHER,
+                                          ProductSource.LOCAL) == ()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+from pytest import raises
+# The parametrize function is generated, so this doesn't work:
+#
+#     from pytest.mark import parametrize
+#
+import pytest
+
+parametrize = pytest.mark.parametrize
+
+from tests.fixtures import *
+from sales_taxes.main import create_cart, price_order
+from sales_taxes.rounding_policy import (StandardRoundingPolicy,
+                                         CeilingRoundingPolicy)
+from sales_taxes.tax_definition import (BasicTaxDefinition,
+                                        ImportTaxDefinition)
+from sales_taxes.tax_profile import (TaxProfileFactory, TaxProfile)
+import pickle
+
+
+class TestTaxProfile(object):
+
+    def test_init(self):
+        profile = TaxProfile([BasicTaxDefinition(), ImportTaxDefinition()],
+                             StandardRoundingPolicy())
+
+        assert len(profile.tax_definitions) == 2
+        assert isinstance(profile.tax_definitions, tuple)
+        assert profile.tax_table.get_rates(ProductCategory.OTHER,
+                                           ProductSource.IMPORTED) == \
+            (Decimal('0.10'), Decimal('0.05'))
+
+        with raises(AssertionError):
+            TaxProfile(['BasicTaxDefinition'], StandardRoundingPolicy())
+        with raises(AssertionError):
+            TaxProfile([BasicTaxDefinition()], 'StandardRoundingPolicy')
+
+    def test_immutable(self):
+        profile = TaxProfile([BasicTaxDefinition()], StandardRoundingPolicy())
+
+        with raises(AttributeError):
+            profile.tax_definitions = ()
+        with raises(AttributeError):
+            del profile.tax_table
+
+    def test_pickle(self):
+        profile = TaxProfile([BasicTaxDefinition()], StandardRoundingPolicy())
+        copy = pickle.loads(pickle.dumps(profile))
+
+        assert len(copy.tax_definitions) == 1
+        assert copy.tax_table.get_rates(ProductCategory.OTHER,
+                                        ProductSource.LOCAL) == \
+            (Decimal('0.10'),)
+
+
+class TestTaxProfileFactory(object):
+
+    def test_get_profile(self):
+        profile = TaxProfileFactory.get_profile('StandardTaxProfile')
+
+        # profiles are created once and shared
+        assert TaxProfileFactory.get_profile('StandardTaxProfile') is profile
+        assert isinstance(profile.rounding_policy, StandardRoundingPolicy)
+        assert isinstance(
+            TaxProfileFactory.get_profile('CeilingTaxProfile').
+            rounding_policy, CeilingRoundingPolicy)
+
+        with raises(KeyError):
+            TaxProfileFactory.get_profile('UnknownTaxProfile')
+
+    def test_register_profile(self):
+        TaxProfileFactory.register_profile('BasicTaxProfile',
+                                           ['BasicTaxDefinition'],
+                                           'StandardRoundingPolicy')
+        try:
+            profile = TaxProfileFactory.get_profile('BasicTaxProfile')
+            assert len(profile.tax_definitions) == 1
+
+            # registering again replaces the cached profile
+            TaxProfileFactory.register_profile('BasicTaxProfile',
+                                               ['ImportTaxDefinition'],
+                                               'StandardRoundingPolicy')
+            assert TaxProfileFactory.get_profile('BasicTaxProfile') \
+                is not profile
+        finally:
+            TaxProfileFactory.PROFILES.pop('BasicTaxProfile')
+            TaxProfileFactory._profiles.pop('BasicTaxProfile', None)
+
+    def test_create_cart(self):
+        lines = ['1 imported bottle of perfume at 27.99\n',
+                 '1 packet of headache pills at 9.75\n']
+
+        cart = create_cart()
+        assert cart._tax_table is \
+            TaxProfileFactory.get_profile('StandardTaxProfile').tax_table
+        assert price_order(lines) == \
+            price_order(lines, tax_profile='CeilingTaxProfile')
+        assert price_order(lines).endswith(
+            "Sales Taxes: 4.20\nTotal: 41.94\n")